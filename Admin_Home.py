@@ -1,10 +1,13 @@
+import time
+t_start = time.perf_counter()
 import streamlit as st
-import pandas as pd
 import json
-from helpers import get_redis, get_club_settings, get_category
+from helpers import get_redis, get_club_settings, check_password, get_categories, record_page_profile, load_pandas, snapshot_read, stale_banner
+t_imported = time.perf_counter()
 
 st.set_page_config(page_title="BBPB Admin", layout="wide")
 r = get_redis()
+offline = stale_banner(r)
 settings = get_club_settings()
 
 if settings['logo_url']:
@@ -13,12 +16,13 @@ if settings['logo_url']:
 st.title("🏃 Bramley Breezers Results & Championship")
 
 # --- 1. PUBLIC VIEW LEADERBOARD (Restored exact app.py layout) ---
-raw_res = r.lrange("race_results", 0, -1)
-raw_mem = r.lrange("members", 0, -1)
+raw_res = snapshot_read("race_results", lambda: r.lrange("race_results", 0, -1))
+raw_mem = snapshot_read("members", lambda: r.lrange("members", 0, -1))
 members_data = [json.loads(m) for m in raw_mem]
 active_names = [m['name'] for m in members_data if m.get('status', 'Active') == 'Active']
 
 if raw_res:
+    pd = load_pandas()
     df = pd.DataFrame([json.loads(res) for res in raw_res])
     df['race_date_dt'] = pd.to_datetime(df['race_date'])
     
@@ -30,7 +34,7 @@ if raw_res:
         disp_df = disp_df[disp_df['race_date_dt'].dt.year == int(sel_year)]
         
     age_mode = settings['age_mode']
-    disp_df['Category'] = disp_df.apply(lambda x: get_category(x['dob'], x['race_date'], age_mode), axis=1)
+    disp_df['Category'] = get_categories(disp_df['dob'], disp_df['race_date'], age_mode)
 
     for d in ["5k", "10k", "10 Mile", "HM", "Marathon"]:
         st.markdown(f"### 🏁 {d}")
@@ -86,7 +90,7 @@ with st.sidebar:
     if not st.session_state['authenticated']:
         pwd = st.text_input("Enter Admin Password", type="password")
         if st.button("Login"):
-            if pwd == settings['admin_password']:
+            if check_password(pwd, settings):
                 st.session_state['authenticated'] = True
                 st.rerun()
             else:
@@ -94,11 +98,14 @@ with st.sidebar:
     else:
         st.success("🔓 Authenticated")
         # Quick Metrics for Admin
-        st.metric("Pending PBs", r.llen("pending_results"))
-        st.metric("Champ Pending", r.llen("champ_pending"))
+        if not offline:
+            st.metric("Pending PBs", r.llen("pending_results"))
+            st.metric("Champ Pending", r.llen("champ_pending"))
         if st.button("Logout"):
             st.session_state['authenticated'] = False
             st.rerun()
 
 if st.session_state['authenticated']:
     st.success("Admin mode active. Use the sidebar to navigate to management pages.")
+
+record_page_profile("Home", t_start, t_imported)
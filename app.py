@@ -1,18 +1,22 @@
+import time
+t_start = time.perf_counter()
 import streamlit as st
-import pandas as pd
-import redis
 import json
-import os
 from datetime import datetime, date
+from helpers import get_redis, get_club_settings, check_password, load_pandas, record_page_profile, snapshot_read, stale_banner, add_result, unique_ids, is_editing, set_editing, prune_editing, replace_in_list, session_state_report, forget_fingerprint, result_fingerprint, group_duplicates, get_categories, refresh_member, rebuild_result_indexes, rank_many, rank_label, rescore_race, valid_time, champ_seasons, get_calendar, save_calendar, filled_races, find_race, season_of, get_season_results
+
+t_imported = time.perf_counter()
 
 # --- 1. CONFIG & CONNECTION ---
 st.set_page_config(page_title="AutoKudos Admin", layout="wide")
 
-redis_url = os.environ.get("REDIS_URL")
 try:
-    r = redis.from_url(redis_url, decode_responses=True)
+    r = get_redis()
 except Exception as e:
     st.error("Redis Connection Failed. Check environment variables.")
+# When Redis is down the leaderboard is served from the local snapshot and admin tools are locked
+offline = stale_banner(r)
+settings = get_club_settings()
 
 # --- 2. GLOBAL HELPERS (Fixed & Verified) ---
 def format_time_string(t_str):
@@ -36,7 +40,7 @@ def time_to_seconds(t_str):
         return 999999
 
 def get_club_logo():
-    stored = r.get("club_logo_url")
+    stored = settings['logo_url']
     return stored if (stored and stored.startswith("http")) else "https://cdn-icons-png.flaticon.com/512/55/55281.png"
 
 def get_category(dob_str, race_date_str, mode="10Y"):
@@ -56,37 +60,39 @@ with st.sidebar:
     st.image(get_club_logo(), width=150)
     st.markdown("### 🔒 Admin Access")
     pwd_input = st.text_input("Password", type="password")
-    admin_pwd = r.get("admin_password") or "admin123"
-    is_admin = (pwd_input == admin_pwd)
+    is_admin = check_password(pwd_input, settings)
     
-    if is_admin:
+    if is_admin and not offline:
         st.success("Admin Authenticated")
         st.divider()
         st.markdown("### 👁️ Public Visibility")
-        current_toggle = r.get("show_champ_tab") == "True"
+        current_toggle = settings['show_champ_tab'] == "True"
         champ_visible = st.toggle("Show Champ Tab on BBPB", value=current_toggle)
         if st.button("Save Visibility Settings"):
             r.set("show_champ_tab", str(champ_visible))
             st.success("Settings Updated")
 
     st.divider()
-    raw_mem = r.lrange("members", 0, -1)
-    members_data = [json.loads(m) for m in raw_mem]
     if st.button("🔄 Force Refresh Data"): st.rerun()
 
-# --- 4. MAIN TABS ---
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    "🏆 Leaderboard", "📥 Submissions", "📋 Race Log", "👥 Members", "🏅 Championship", "⚙️ System"
-])
+def load_members():
+    return [json.loads(m) for m in snapshot_read("members", lambda: r.lrange("members", 0, -1))]
+
+# --- 4. MAIN SECTIONS ---
+# Only the selected section runs, so admin sections cost nothing until they are opened
+sections = ["🏆 Leaderboard", "📥 Submissions", "📋 Race Log", "👥 Members", "🏅 Championship", "⚙️ System"]
+section = st.radio("Section", sections, horizontal=True, label_visibility="collapsed", key="app_section")
 
 all_dist = ["5k", "10k", "10 Mile", "HM", "Marathon"]
+age_mode = settings['age_mode']
 
 # --- TAB 1: LEADERBOARD ---
-with tab1:
-    raw_res = r.lrange("race_results", 0, -1)
-    active_names = [m['name'] for m in members_data if m.get('status', 'Active') == 'Active']
+if section == sections[0]:
+    raw_res = snapshot_read("race_results", lambda: r.lrange("race_results", 0, -1))
+    active_names = [m['name'] for m in load_members() if m.get('status', 'Active') == 'Active']
     
     if raw_res:
+        pd = load_pandas()
         df = pd.DataFrame([json.loads(res) for res in raw_res])
         df['race_date_dt'] = pd.to_datetime(df['race_date'])
         years = ["All-Time"] + sorted([str(y) for y in df['race_date_dt'].dt.year.unique()], reverse=True)
@@ -96,8 +102,7 @@ with tab1:
         if sel_year != "All-Time":
             display_df = display_df[display_df['race_date_dt'].dt.year == int(sel_year)]
             
-        age_mode = r.get("age_mode") or "10Y"
-        display_df['Category'] = display_df.apply(lambda x: get_category(x['dob'], x['race_date'], age_mode), axis=1)
+        display_df['Category'] = get_categories(display_df['dob'], display_df['race_date'], age_mode)
 
         for d in all_dist:
             st.markdown(f"### 🏁 {d}")
@@ -115,138 +120,203 @@ with tab1:
                                 <div><span style="background:#FFD700; color:#003366; padding:2px 5px; border-radius:3px; font-weight:bold; font-size:0.75em; margin-right:5px;">{row['Category']}</span><b>{row['name']}</b><br><small>{row['location']}</small></div>
                                 <div style="font-weight:bold; color:#003366;">{row['time_display']}</div></div>''', unsafe_allow_html=True)
 
-if is_admin:
-    with tab2: # SUBMISSIONS
-        st.subheader("⚡ Manual Entry & Approvals")
-        with st.form("manual_entry"):
-            c1, c2, c3 = st.columns(3)
-            name_sel = c1.selectbox("Member", sorted([m['name'] for m in members_data]))
-            dist_sel = c2.selectbox("Distance", all_dist)
-            time_in = c3.text_input("Time (HH:MM:SS)")
-            loc_in = st.text_input("Race Name")
-            date_in = st.date_input("Race Date")
-            if st.form_submit_button("Direct Add"):
-                match = next(m for m in members_data if m['name'] == name_sel)
-                entry = {"name": name_sel, "gender": match['gender'], "dob": match['dob'], "distance": dist_sel, "time_seconds": time_to_seconds(time_in), "time_display": format_time_string(time_in), "location": loc_in, "race_date": str(date_in)}
-                r.rpush("race_results", json.dumps(entry)); st.success("Saved"); st.rerun()
+elif not is_admin or offline:
+    st.warning("🔒 Database unreachable: admin tools are read-only until it is back." if offline else "🔒 Login in sidebar.")
+elif section == sections[1]: # SUBMISSIONS
+    st.subheader("⚡ Manual Entry & Approvals")
+    members_data = load_members()
+    with st.form("manual_entry"):
+        c1, c2, c3 = st.columns(3)
+        name_sel = c1.selectbox("Member", sorted([m['name'] for m in members_data]))
+        dist_sel = c2.selectbox("Distance", all_dist)
+        time_in = c3.text_input("Time (HH:MM:SS)")
+        loc_in = st.text_input("Race Name")
+        date_in = st.date_input("Race Date")
+        if st.form_submit_button("Direct Add"):
+            match = next(m for m in members_data if m['name'] == name_sel)
+            entry = {"name": name_sel, "gender": match['gender'], "dob": match['dob'], "distance": dist_sel, "time_seconds": time_to_seconds(time_in), "time_display": format_time_string(time_in), "location": loc_in, "race_date": str(date_in)}
+            if add_result(r, entry, age_mode): st.success("Saved"); st.rerun()
+            else: st.warning("This result is already in the log.")
 
-        st.divider()
-        st.subheader("📋 Pending PB Approvals")
-        pending = r.lrange("pending_results", 0, -1)
-        if pending:
-            for i, p_json in enumerate(pending):
-                p = json.loads(p_json)
-                with st.expander(f"Review: {p['name']} - {p['distance']}"):
-                    match = next((m for m in members_data if m['name'] == p['name']), None)
-                    if match:
-                        if st.button("✅ Approve", key=f"app_{i}"):
-                            entry = {"name": p['name'], "gender": match['gender'], "dob": match['dob'], "distance": p['distance'], "time_seconds": time_to_seconds(p['time_display']), "time_display": format_time_string(p['time_display']), "location": p['location'], "race_date": p['race_date']}
-                            r.rpush("race_results", json.dumps(entry)); r.lrem("pending_results", 1, p_json); st.rerun()
-                    if st.button("❌ Reject", key=f"rej_{i}"): r.lrem("pending_results", 1, p_json); st.rerun()
-
-    with tab3: # RACE LOG
-        st.subheader("📋 Master Record Management")
-        results = r.lrange("race_results", 0, -1)
-        for idx, val in enumerate(results):
-            item = json.loads(val)
-            key_st = f"edit_log_{idx}"
-            with st.container(border=True):
-                c1, c2, c3 = st.columns([4,1,1])
-                c1.write(f"**{item['name']}** | {item['distance']} | {item['time_display']} | {item['race_date']}")
-                if c2.button("Edit", key=f"edit_l_{idx}"): st.session_state[key_st] = True
-                if c3.button("🗑️", key=f"del_l_{idx}"):
-                    r.lset("race_results", idx, "WIPE"); r.lrem("race_results", 1, "WIPE"); st.rerun()
-                if st.session_state.get(key_st):
-                    with st.form(f"form_l_{idx}"):
-                        nt, nd = st.text_input("Time", item['time_display']), st.text_input("Date", item['race_date'])
-                        if st.form_submit_button("Update"):
-                            item.update({"time_display": format_time_string(nt), "race_date": nd, "time_seconds": time_to_seconds(nt)})
-                            r.lset("race_results", idx, json.dumps(item)); st.session_state[key_st] = False; st.rerun()
-
-    with tab4: # MEMBERS
-        st.subheader("👥 Members")
-        for i, m_json in enumerate(r.lrange("members", 0, -1)):
-            m = json.loads(m_json)
-            m_st = f"edit_mem_{i}"
-            with st.container(border=True):
-                c1, c2, c3 = st.columns([3,1,1])
-                c1.write(f"**{m['name']}** - {m.get('status', 'Active')}")
-                if c2.button("Toggle Status", key=f"tog_m_{i}"):
-                    m['status'] = "Left" if m.get('status', 'Active') == "Active" else "Active"
-                    r.lset("members", i, json.dumps(m)); st.rerun()
-                if c3.button("Edit Details", key=f"edit_m_{i}"): st.session_state[m_st] = True
-                if st.session_state.get(m_st):
-                    with st.form(f"form_m_{i}"):
-                        un, ud, ug = st.text_input("Name", m['name']), st.text_input("DOB", m['dob']), st.selectbox("Gender", ["Male", "Female"], index=0 if m['gender']=="Male" else 1)
-                        if st.form_submit_button("Save"):
-                            m.update({"name": un, "dob": ud, "gender": ug}); r.lset("members", i, json.dumps(m)); st.session_state[m_st] = False; st.rerun()
-
-    with tab5: # CHAMPIONSHIP
-        st.subheader("🏅 Championship")
-        c1, c2, c3 = st.tabs(["Point Approvals", "Calendar", "Raw Points Log"])
-        with c1:
-            c_pend = r.lrange("champ_pending", 0, -1)
-            for i, cj in enumerate(c_pend):
+    st.divider()
+    st.subheader("📋 Pending PB Approvals")
+    pending = r.lrange("pending_results", 0, -1)
+    # Identical submissions are collapsed into one review; approving or rejecting clears every copy
+    groups = list(group_duplicates(pending).values())
+    entries = []
+    for copies in groups:
+        p = json.loads(copies[0])
+        match = next((m for m in members_data if m['name'] == p['name']), None)
+        entries.append({"name": p['name'], "gender": match['gender'], "dob": match['dob'], "distance": p['distance'], "time_seconds": time_to_seconds(p['time_display']), "time_display": format_time_string(p['time_display']), "location": p['location'], "race_date": p['race_date']} if match else None)
+    # Where each submitted time would place, looked up for the whole queue in one go
+    ranks = iter(rank_many(r, [e for e in entries if e], age_mode))
+    for i, (copies, entry) in enumerate(zip(groups, entries)):
+        p = json.loads(copies[0])
+        dupe_note = f" (x{len(copies)})" if len(copies) > 1 else ""
+        with st.expander(f"Review: {p['name']} - {p['distance']}{dupe_note}"):
+            if entry:
+                st.caption(rank_label(next(ranks), get_category(entry['dob'], entry['race_date'], age_mode)))
+                if st.button("✅ Approve", key=f"app_{i}"):
+                    add_result(r, entry, age_mode)
+                    for c in copies: r.lrem("pending_results", 0, c)
+                    forget_fingerprint(r, "pending_results", p); st.rerun()
+            if st.button("❌ Reject", key=f"rej_{i}"):
+                for c in copies: r.lrem("pending_results", 0, c)
+                forget_fingerprint(r, "pending_results", p); st.rerun()
+
+elif section == sections[2]: # RACE LOG
+    st.subheader("📋 Master Record Management")
+    raw_results = r.lrange("race_results", 0, -1)
+    results = [json.loads(val) for val in raw_results]
+    # Rows are keyed by record id, so flags and widgets follow the record after a delete
+    row_ids = unique_ids(result_fingerprint(item) for item in results)
+    prune_editing("log", row_ids)
+    for idx, (val, item, rid, item_ranks) in enumerate(zip(raw_results, results, row_ids, rank_many(r, results, age_mode))):
+        with st.container(border=True):
+            c1, c2, c3 = st.columns([4,1,1])
+            c1.write(f"**{item['name']}** | {item['distance']} | {item['time_display']} | {item['race_date']}")
+            c1.caption(rank_label(item_ranks, get_category(item.get('dob'), item.get('race_date'), age_mode)))
+            if c2.button("Edit", key=f"edit_l_{rid}"): set_editing("log", rid)
+            if c3.button("🗑️", key=f"del_l_{rid}"):
+                r.lrem("race_results", 1, val); forget_fingerprint(r, "race_results", item); refresh_member(r, item, age_mode); set_editing("log", rid, False); st.rerun()
+            if is_editing("log", rid):
+                with st.form(f"form_l_{rid}"):
+                    nt, nd = st.text_input("Time", item['time_display']), st.text_input("Date", item['race_date'])
+                    if st.form_submit_button("Update"):
+                        new_item = {**item, "time_display": format_time_string(nt), "race_date": nd, "time_seconds": time_to_seconds(nt)}
+                        # Indexes are only touched once the row is known to still hold what was rendered
+                        if replace_in_list(r, "race_results", idx, val, json.dumps(new_item)):
+                            forget_fingerprint(r, "race_results", item); r.sadd("race_results_fp", result_fingerprint(new_item)); refresh_member(r, item, age_mode, added=new_item); set_editing("log", rid, False); st.rerun()
+                        else: st.error("This result was changed or removed since the page loaded. Refresh and try again.")
+
+elif section == sections[3]: # MEMBERS
+    st.subheader("👥 Members")
+    raw_members = r.lrange("members", 0, -1)
+    member_ids = unique_ids(json.loads(m_json)['name'] for m_json in raw_members)
+    prune_editing("member", member_ids)
+    for i, (m_json, mid) in enumerate(zip(raw_members, member_ids)):
+        m = json.loads(m_json)
+        with st.container(border=True):
+            c1, c2, c3 = st.columns([3,1,1])
+            c1.write(f"**{m['name']}** - {m.get('status', 'Active')}")
+            if c2.button("Toggle Status", key=f"tog_m_{mid}"):
+                m['status'] = "Left" if m.get('status', 'Active') == "Active" else "Active"
+                if replace_in_list(r, "members", i, m_json, json.dumps(m)): st.rerun()
+                else: st.error("This member was changed or removed since the page loaded. Refresh and try again.")
+            if c3.button("Edit Details", key=f"edit_m_{mid}"): set_editing("member", mid)
+            if is_editing("member", mid):
+                with st.form(f"form_m_{mid}"):
+                    un, ud, ug = st.text_input("Name", m['name']), st.text_input("DOB", m['dob']), st.selectbox("Gender", ["Male", "Female"], index=0 if m['gender']=="Male" else 1)
+                    if st.form_submit_button("Save"):
+                        m.update({"name": un, "dob": ud, "gender": ug})
+                        if replace_in_list(r, "members", i, m_json, json.dumps(m)): set_editing("member", mid, False); st.rerun()
+                        else: st.error("This member was changed or removed since the page loaded. Refresh and try again.")
+
+elif section == sections[4]: # CHAMPIONSHIP
+    st.subheader("🏅 Championship")
+    c_season = st.selectbox("Season", champ_seasons(r), key="app_champ_season")
+    c_views = ["Point Approvals", "Calendar", "Raw Points Log"]
+    c_view = st.radio("View", c_views, horizontal=True, key="app_champ_view")
+    if c_view == c_views[0]:
+        c_pend = r.lrange("champ_pending", 0, -1)
+        member_db = {m['name']: m for m in load_members()}
+        c_age_mode = settings['age_mode']
+        races = {}
+        for cj in c_pend:
+            cp = json.loads(cj)
+            races.setdefault((season_of(cp), cp['race_name']), []).append(cj)
+        for ri, ((p_season, race_name), raws) in enumerate(races.items()):
+            st.markdown(f"**{p_season}: {race_name}** ({len(raws)} pending)")
+            for j, cj in enumerate(raws):
                 cp = json.loads(cj)
-                st.write(f"**{cp['name']}** - {cp['race_name']} ({cp['time_display']})")
-                wt = st.text_input("Category Winner Time", key=f"wt_{i}")
-                if st.button("Approve & Calc", key=f"c_ap_{i}"):
-                    pts = round((time_to_seconds(wt) / time_to_seconds(cp['time_display'])) * 100, 1)
-                    r.rpush("champ_results_final", json.dumps({"name": cp['name'], "race": cp['race_name'], "points": pts, "date": cp['date']}))
-                    r.lrem("champ_pending", 1, cj); st.rerun()
-        with c2:
-            cal_raw = r.get("champ_calendar_2026")
-            calendar = json.loads(cal_raw) if cal_raw else []
-            new_cal = []
-            for i in range(15):
-                ra = calendar[i] if i < len(calendar) else {"date": "TBC", "name": "TBC", "distance": "TBC", "terrain": "Road"}
-                with st.expander(f"Race {i+1}: {ra['name']}"):
-                    d, n, dist, terr = st.text_input("Date", ra['date'], key=f"d_{i}"), st.text_input("Name", ra['name'], key=f"n_{i}"), st.text_input("Dist", ra['distance'], key=f"dist_{i}"), st.selectbox("Type", ["Road", "Trail", "Fell", "XC"], key=f"terr_{i}")
-                    new_cal.append({"date": d, "name": n, "distance": dist, "terrain": terr})
-            if st.button("Save Calendar"): r.set("champ_calendar_2026", json.dumps(new_cal)); st.rerun()
-        with c3:
-            final_raw = r.lrange("champ_results_final", 0, -1)
-            if final_raw: st.dataframe(pd.DataFrame([json.loads(x) for x in final_raw]), use_container_width=True)
-
-    with tab6: # SYSTEM (VERIFIED)
-        st.subheader("⚙️ System Tools")
-        c_br1, c_br2 = st.columns(2)
-        with c_br1:
-            logo = st.text_input("Logo URL", r.get("club_logo_url") or "")
-            if st.button("Update Logo"): r.set("club_logo_url", logo); st.rerun()
-        with c_br2:
-            new_pwd = st.text_input("Admin Password", type="password")
-            if st.button("Update Password"): r.set("admin_password", new_pwd); st.success("Changed")
+                st.write(f"{cp['name']} ({cp['time_display']})")
+                # Entries without a valid time are never scored; they wait here to be rejected
+                if not valid_time(cp['time_display']):
+                    st.warning("Time is missing, zero or unreadable, so this entry is not scored.")
+                    if st.button("❌ Reject", key=f"c_rej_{ri}_{j}"):
+                        r.lrem("champ_pending", 0, cj); forget_fingerprint(r, "champ_pending", cp); st.rerun()
+            raws = [cj for cj in raws if valid_time(json.loads(cj)['time_display'])]
+            if not raws:
+                continue
+            race = find_race(get_calendar(r, p_season), race_name, json.loads(raws[0])['date'])
+            if race is None:
+                st.warning(f"Add this race to the {p_season} calendar to score it.")
+            # Category winners are found automatically; approved results for the race are rescored too
+            elif st.button("Approve & Calc All", key=f"c_ap_{ri}"):
+                rescore_race(r, p_season, race, [json.loads(cj) for cj in raws], member_db, c_age_mode)
+                for cj in raws:
+                    r.lrem("champ_pending", 0, cj); forget_fingerprint(r, "champ_pending", json.loads(cj))
+                st.rerun()
+    elif c_view == c_views[1]:
+        pd = load_pandas()
+        # One editable table (keyed by season) instead of four widgets per race; race ids stay hidden and are kept on save
+        with st.form(f"app_cal_form_{c_season}"):
+            edited = st.data_editor(
+                pd.DataFrame(get_calendar(r, c_season), columns=["id", "name", "date", "distance", "terrain"]),
+                column_order=["name", "date", "distance", "terrain"],
+                column_config={
+                    "name": st.column_config.TextColumn("Name"),
+                    "date": st.column_config.TextColumn("Date (YYYY-MM-DD)"),
+                    "distance": st.column_config.TextColumn("Dist"),
+                    "terrain": st.column_config.SelectboxColumn("Type", options=["Road", "Trail", "Fell", "XC"]),
+                },
+                num_rows="dynamic", hide_index=True, use_container_width=True, key=f"app_cal_{c_season}"
+            )
+            if st.form_submit_button("Save Calendar"): save_calendar(r, c_season, filled_races(edited.to_dict('records'))); st.rerun()
+    else:
+        season_res = get_season_results(r, c_season)
+        if season_res: st.dataframe(load_pandas().DataFrame(season_res), use_container_width=True)
 
-        st.divider()
-        st.markdown("### 🎂 Age Mode & 💾 Backups")
-        cc1, cc2 = st.columns(2)
-        with cc1:
-            curr_mode = r.get("age_mode") or "10Y"
-            new_mode = st.radio("Leaderboard Mode:", ["10Y", "5Y"], index=0 if curr_mode=="10Y" else 1, horizontal=True)
-            if st.button("Save Age Mode"): r.set("age_mode", new_mode); st.success("Set")
-        with cc2:
+elif section == sections[5]: # SYSTEM (VERIFIED)
+    pd = load_pandas()
+    st.subheader("⚙️ System Tools")
+    c_br1, c_br2 = st.columns(2)
+    with c_br1:
+        logo = st.text_input("Logo URL", r.get("club_logo_url") or "")
+        if st.button("Update Logo"): r.set("club_logo_url", logo); st.rerun()
+    with c_br2:
+        new_pwd = st.text_input("Admin Password", type="password")
+        if st.button("Update Password"): r.set("admin_password", new_pwd); st.success("Changed")
+
+    st.divider()
+    st.markdown("### 🎂 Age Mode & 💾 Backups")
+    cc1, cc2 = st.columns(2)
+    with cc1:
+        curr_mode = r.get("age_mode") or "10Y"
+        new_mode = st.radio("Leaderboard Mode:", ["10Y", "5Y"], index=0 if curr_mode=="10Y" else 1, horizontal=True)
+        if st.button("Save Age Mode"): r.set("age_mode", new_mode); rebuild_result_indexes(r, new_mode); st.success("Set")
+    with cc2:
+        # The CSVs are only built while this is switched on, not on every visit to System
+        if st.toggle("Prepare CSV exports", key="app_exports"):
+            members_data = load_members()
             if members_data: st.download_button("📥 Export Members", pd.DataFrame(members_data).to_csv(index=False), "members.csv", "text/csv")
             res_raw = r.lrange("race_results", 0, -1)
             if res_raw: st.download_button("📥 Export Results", pd.DataFrame([json.loads(x) for x in res_raw]).to_csv(index=False), "results.csv", "text/csv")
 
-        st.divider()
-        st.markdown("### 📤 Bulk Uploads")
-        u1, u2 = st.columns(2)
-        with u1:
-            mf = st.file_uploader("Members CSV", type="csv")
-            if mf and st.button("Import Members"):
-                for _, row in pd.read_csv(mf).iterrows(): r.rpush("members", json.dumps({"name": row['name'], "gender": row['gender'], "dob": str(row['dob']), "status": "Active"}))
-                st.success("Imported"); st.rerun()
-        with u2:
-            pf = st.file_uploader("PB CSV", type="csv")
-            if pf and st.button("Import PBs"):
-                m_look = {m['name']: m for m in members_data}
-                for _, row in pd.read_csv(pf).iterrows():
-                    if row['name'] in m_look:
-                        m = m_look[row['name']]; e = {"name": row['name'], "gender": m['gender'], "dob": m['dob'], "distance": str(row['distance']), "time_seconds": time_to_seconds(row['time_display']), "time_display": format_time_string(row['time_display']), "location": row['location'], "race_date": str(row['race_date'])}
-                        r.rpush("race_results", json.dumps(e))
-                st.success("Imported"); st.rerun()
-else:
-    for t in [tab2, tab3, tab4, tab5, tab6]:
-        with t: st.warning("🔒 Login in sidebar.")
+    st.divider()
+    st.markdown("### 📤 Bulk Uploads")
+    u1, u2 = st.columns(2)
+    with u1:
+        mf = st.file_uploader("Members CSV", type="csv")
+        if mf and st.button("Import Members"):
+            for _, row in pd.read_csv(mf).iterrows(): r.rpush("members", json.dumps({"name": row['name'], "gender": row['gender'], "dob": str(row['dob']), "status": "Active"}))
+            st.success("Imported"); st.rerun()
+    with u2:
+        pf = st.file_uploader("PB CSV", type="csv")
+        if pf and st.button("Import PBs"):
+            m_look = {m['name']: m for m in load_members()}
+            for _, row in pd.read_csv(pf).iterrows():
+                if row['name'] in m_look:
+                    m = m_look[row['name']]; e = {"name": row['name'], "gender": m['gender'], "dob": m['dob'], "distance": str(row['distance']), "time_seconds": time_to_seconds(row['time_display']), "time_display": format_time_string(row['time_display']), "location": row['location'], "race_date": str(row['race_date'])}
+                    add_result(r, e, age_mode)
+            st.success("Imported"); st.rerun()
+
+    st.divider()
+    st.markdown("### 📈 Session Instrumentation")
+    # Pickling the whole session is not free, so it is only measured when asked for
+    if st.button("Measure Session"):
+        sess = session_state_report()
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Session keys", sess['keys']); m2.metric("Session size", f"{sess['bytes'] / 1024:.1f} KB"); m3.metric("Open edit forms", sess['edit_flags'])
+
+record_page_profile("Legacy App", t_start, t_imported, gated=section != sections[0] and not is_admin)
@@ -1,21 +1,270 @@
 import streamlit as st
 import redis
 import json
+import hashlib
+import hmac
+import uuid
+import pickle
+from collections import OrderedDict
+from contextlib import contextmanager
 import os
+import time
+import sqlite3
 from datetime import datetime
 
+@st.cache_resource
 def get_redis():
-    return redis.from_url(os.environ.get("REDIS_URL"), decode_responses=True)
+    # One client (and connection pool) per server process instead of one per rerun.
+    # Timeouts keep a stalled Redis from hanging the page; reads then fall back to the snapshot.
+    return redis.from_url(os.environ.get("REDIS_URL"), decode_responses=True,
+                          socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT)
 
 def get_club_settings():
-    r = get_redis()
+    # Only a hash of the admin password is returned (and so copied to the offline snapshot)
+    def fetch():
+        age_mode, logo_url, admin_password, show_champ_tab = get_redis().mget("age_mode", "club_logo_url", "admin_password", "show_champ_tab")
+        return [age_mode, logo_url, password_hash(admin_password or "admin123"), show_champ_tab]
+    age_mode, logo_url, admin_password_hash, show_champ_tab = snapshot_read("club_settings", fetch)
     return {
-        "age_mode": r.get("age_mode") or "10Y",
-        "logo_url": r.get("club_logo_url") or "",  # Fixed key name here
-        "admin_password": r.get("admin_password") or "admin123",
-        "show_champ_tab": r.get("show_champ_tab") or "False"
+        "age_mode": age_mode or "10Y",
+        "logo_url": logo_url or "",  # Fixed key name here
+        "admin_password_hash": admin_password_hash,
+        "show_champ_tab": show_champ_tab or "False"
     }
 
+def password_hash(pwd):
+    return hashlib.sha256(str(pwd).encode()).hexdigest()
+
+def check_password(pwd, settings):
+    return hmac.compare_digest(password_hash(pwd), settings['admin_password_hash'] or "")
+
+# --- OFFLINE SNAPSHOT ---
+# Every successful read of members, results, standings and settings is copied into a local
+# SQLite file. If Redis is slower than REDIS_TIMEOUT or unreachable, a breaker opens for
+# BREAKER_SECONDS and reads are served from that copy; writes made meanwhile are queued in the
+# same file and replayed, in order, once Redis answers again. SNAPSHOT_PATH="" turns this off.
+# A queued write that keeps failing for a reason other than the connection is moved to
+# failed_writes after REPLAY_ATTEMPTS tries, so it cannot hold up the rest of the queue.
+REDIS_TIMEOUT = float(os.environ.get("REDIS_TIMEOUT", "2"))
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", "bbpb_snapshot.db")
+SNAPSHOT_MIN_INTERVAL = 30
+BREAKER_SECONDS = 15
+REPLAY_ATTEMPTS = 3
+CLAIM_SECONDS = 60
+# Errors that mean Redis is down or slow, as opposed to a bad command or payload
+OUTAGE_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)
+breaker = {"open_until": 0.0}
+snapshot_saved = {}
+snapshot_schema = set()
+
+@contextmanager
+def _snapshot_db():
+    # Commits on success and always closes; the schema is checked once per file per process
+    conn = sqlite3.connect(SNAPSHOT_PATH, timeout=5)
+    try:
+        with conn:
+            if SNAPSHOT_PATH not in snapshot_schema:
+                conn.execute("CREATE TABLE IF NOT EXISTS snapshot (name TEXT PRIMARY KEY, value TEXT, saved_at REAL)")
+                conn.execute("CREATE TABLE IF NOT EXISTS write_queue (id INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT, args TEXT, queued_at REAL, attempts INTEGER DEFAULT 0, claimed_until REAL DEFAULT 0)")
+                conn.execute("CREATE TABLE IF NOT EXISTS failed_writes (id INTEGER PRIMARY KEY, op TEXT, args TEXT, queued_at REAL, error TEXT, failed_at REAL)")
+                # Queue files written before rows carried attempts and claims
+                cols = [c[1] for c in conn.execute("PRAGMA table_info(write_queue)")]
+                if "attempts" not in cols:
+                    conn.execute("ALTER TABLE write_queue ADD COLUMN attempts INTEGER DEFAULT 0")
+                    conn.execute("ALTER TABLE write_queue ADD COLUMN claimed_until REAL DEFAULT 0")
+                snapshot_schema.add(SNAPSHOT_PATH)
+            yield conn
+    finally:
+        conn.close()
+
+def redis_online(r):
+    if time.time() < breaker["open_until"]:
+        return False
+    try:
+        r.ping()
+        return True
+    except redis.exceptions.RedisError:
+        breaker["open_until"] = time.time() + BREAKER_SECONDS
+        return False
+
+def snapshot_read(name, fetch):
+    if time.time() >= breaker["open_until"]:
+        try:
+            value = fetch()
+        except OUTAGE_ERRORS:
+            # Only an unreachable or slow Redis falls back; command errors are real bugs and propagate
+            if not SNAPSHOT_PATH:
+                raise
+            breaker["open_until"] = time.time() + BREAKER_SECONDS
+        else:
+            if SNAPSHOT_PATH and time.time() - snapshot_saved.get(name, 0) > SNAPSHOT_MIN_INTERVAL:
+                with _snapshot_db() as conn:
+                    conn.execute("INSERT OR REPLACE INTO snapshot VALUES (?, ?, ?)", (name, json.dumps(value), time.time()))
+                snapshot_saved[name] = time.time()
+            return value
+    if not SNAPSHOT_PATH:
+        return fetch()
+    with _snapshot_db() as conn:
+        row = conn.execute("SELECT value FROM snapshot WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        raise redis.exceptions.ConnectionError(f"Redis is unavailable and there is no local copy of {name}")
+    return json.loads(row[0])
+
+def snapshot_age():
+    if not SNAPSHOT_PATH:
+        return None
+    with _snapshot_db() as conn:
+        row = conn.execute("SELECT MIN(saved_at) FROM snapshot").fetchone()
+    return datetime.fromtimestamp(row[0]).strftime('%Y-%m-%d %H:%M') if row and row[0] else None
+
+def queue_write(r, op, *args):
+    # Runs op (a name in QUEUED_WRITES) now, or queues it if Redis is down. Returns None when queued.
+    if redis_online(r):
+        try:
+            return QUEUED_WRITES[op](r, *args)
+        except OUTAGE_ERRORS:
+            breaker["open_until"] = time.time() + BREAKER_SECONDS
+    if not SNAPSHOT_PATH:
+        raise redis.exceptions.ConnectionError("Redis is unavailable")
+    with _snapshot_db() as conn:
+        conn.execute("INSERT INTO write_queue (op, args, queued_at) VALUES (?, ?, ?)", (op, json.dumps(args), time.time()))
+    return None
+
+def replay_writes(r):
+    # Every queued op is safe to run twice (a timeout can hide a write that did land), and
+    # each row is claimed before it runs so two sessions reconnecting together don't both run it
+    if not SNAPSHOT_PATH:
+        return 0
+    with _snapshot_db() as conn:
+        rows = conn.execute("SELECT id, op, args FROM write_queue ORDER BY id").fetchall()
+    done = 0
+    for row_id, op, args in rows:
+        with _snapshot_db() as conn:
+            claimed = conn.execute("UPDATE write_queue SET claimed_until = ? WHERE id = ? AND claimed_until < ?", (time.time() + CLAIM_SECONDS, row_id, time.time())).rowcount
+        if not claimed:
+            break  # another session is replaying the queue; leave the rest to it, in order
+        try:
+            QUEUED_WRITES[op](r, *json.loads(args))
+        except OUTAGE_ERRORS:
+            with _snapshot_db() as conn:
+                conn.execute("UPDATE write_queue SET claimed_until = 0 WHERE id = ?", (row_id,))
+            breaker["open_until"] = time.time() + BREAKER_SECONDS
+            break
+        except Exception as e:
+            with _snapshot_db() as conn:
+                conn.execute("UPDATE write_queue SET attempts = attempts + 1, claimed_until = 0 WHERE id = ?", (row_id,))
+                conn.execute("INSERT INTO failed_writes SELECT id, op, args, queued_at, ?, ? FROM write_queue WHERE id = ? AND attempts >= ?", (repr(e), time.time(), row_id, REPLAY_ATTEMPTS))
+                conn.execute("DELETE FROM write_queue WHERE id = ? AND attempts >= ?", (row_id, REPLAY_ATTEMPTS))
+            break
+        with _snapshot_db() as conn:
+            conn.execute("DELETE FROM write_queue WHERE id = ?", (row_id,))
+        done += 1
+    return done
+
+def pending_writes():
+    if not SNAPSHOT_PATH:
+        return 0
+    with _snapshot_db() as conn:
+        return conn.execute("SELECT COUNT(*) FROM write_queue").fetchone()[0]
+
+def failed_writes():
+    if not SNAPSHOT_PATH:
+        return []
+    with _snapshot_db() as conn:
+        rows = conn.execute("SELECT id, op, args, queued_at, error, failed_at FROM failed_writes ORDER BY id").fetchall()
+    return [{"id": row_id, "op": op, "args": args, "queued": datetime.fromtimestamp(queued_at).strftime('%Y-%m-%d %H:%M'),
+             "error": error, "failed": datetime.fromtimestamp(failed_at).strftime('%Y-%m-%d %H:%M')} for row_id, op, args, queued_at, error, failed_at in rows]
+
+def stale_banner(r):
+    # Shows the read-only banner and returns True when Redis is down; otherwise flushes queued writes
+    if redis_online(r):
+        replayed = replay_writes(r)
+        if replayed:
+            st.success(f"Database is back: saved {replayed} queued change(s).")
+        failed = len(failed_writes())
+        if failed:
+            st.error(f"{failed} queued change(s) could not be saved. See System > Instrumentation.")
+        return False
+    age = snapshot_age()
+    queued = pending_writes()
+    st.warning(f"⚠️ Database unreachable. Showing stale data{f' saved {age}' if age else ''}, read-only."
+               + (f" {queued} change(s) queued and will be saved when it is back." if queued else ""))
+    return True
+
+# --- STARTUP PROFILE ---
+# Pages note when they started, when their imports finished and when they stopped rendering.
+# Kept at module level, so it covers the whole server process and survives reruns.
+page_profiles = {}
+
+def record_page_profile(page, t_start, t_imported, gated=False):
+    now = time.perf_counter()
+    prof = page_profiles.setdefault(page, {"page": page, "first_import_ms": round((t_imported - t_start) * 1000, 1), "first_render_ms": round((now - t_imported) * 1000, 1), "runs": 0})
+    prof["runs"] += 1
+    prof["last_import_ms"] = round((t_imported - t_start) * 1000, 1)
+    prof["last_render_ms"] = round((now - t_imported) * 1000, 1)
+    prof["last_run"] = "login gate" if gated else "full page"
+
+def load_pandas():
+    # pandas is the slowest import in the app, so only pay for it when a page needs a table
+    t0 = time.perf_counter()
+    import pandas as pd
+    page_profiles.setdefault("pandas import", {"page": "pandas import", "first_import_ms": round((time.perf_counter() - t0) * 1000, 1), "runs": 0})
+    return pd
+
+# --- ROW EDIT STATE ---
+# Open edit forms are remembered per record id (not list position) in one bounded,
+# least-recently-used map, instead of one session_state flag per row.
+EDIT_FLAGS_KEY = "row_edit_flags"
+EDIT_FLAGS_LIMIT = 20
+
+def _edit_flags():
+    return st.session_state.setdefault(EDIT_FLAGS_KEY, OrderedDict())
+
+def is_editing(kind, record_id):
+    return (kind, record_id) in _edit_flags()
+
+def set_editing(kind, record_id, on=True):
+    flags = _edit_flags()
+    if not on:
+        flags.pop((kind, record_id), None)
+        return
+    flags[(kind, record_id)] = True
+    flags.move_to_end((kind, record_id))
+    while len(flags) > EDIT_FLAGS_LIMIT:
+        flags.popitem(last=False)
+
+def prune_editing(kind, live_ids):
+    # Called once per rerun with the ids on screen; drops flags for deleted or renamed records
+    flags = _edit_flags()
+    live = set(live_ids)
+    for key in [k for k in flags if k[0] == kind and k[1] not in live]:
+        del flags[key]
+
+def unique_ids(ids):
+    # Identical records share an id; number the repeats so widget keys stay unique
+    seen, out = {}, []
+    for rid in ids:
+        seen[rid] = seen.get(rid, 0) + 1
+        out.append(rid if seen[rid] == 1 else f"{rid}_{seen[rid]}")
+    return out
+
+def replace_in_list(r, list_key, idx, old_raw, new_raw):
+    # Writes by position only if that position still holds the record we rendered
+    pos = idx if idx is not None and r.lindex(list_key, idx) == old_raw else r.lpos(list_key, old_raw)
+    if pos is None:
+        return False
+    r.lset(list_key, pos, new_raw)
+    return True
+
+def session_state_report():
+    sizes = {}
+    for key in list(st.session_state.keys()):
+        try:
+            sizes[key] = len(pickle.dumps(st.session_state[key]))
+        except:
+            sizes[key] = 0
+    return {"keys": len(sizes), "bytes": sum(sizes.values()), "edit_flags": len(_edit_flags()), "largest": sorted(sizes.items(), key=lambda kv: -kv[1])[:5]}
+
 def format_time_string(t_str):
     try:
         parts = str(t_str).strip().split(':')
@@ -49,3 +298,431 @@ def get_category(dob_str, race_date_str, mode="10Y"):
         return f"V{(age // step) * step}"
     except: 
         return "Unknown"
+
+def get_categories(dobs, race_dates, mode="10Y"):
+    # Column-at-a-time version of get_category for whole DataFrames
+    pd = load_pandas()
+    dob = pd.to_datetime(pd.Series(list(dobs), dtype=object), format='%Y-%m-%d', errors='coerce')
+    race_date = pd.to_datetime(pd.Series(list(race_dates), dtype=object), format='%Y-%m-%d', errors='coerce')
+    before_bday = (race_date.dt.month < dob.dt.month) | ((race_date.dt.month == dob.dt.month) & (race_date.dt.day < dob.dt.day))
+    age = race_date.dt.year - dob.dt.year - before_bday.astype(int)
+    step = 5 if mode == "5Y" else 10
+    cats = "V" + ((age // step) * step).astype('Int64').astype(str)
+    cats = cats.where(age >= (35 if mode == "5Y" else 40), "Senior")
+    return cats.where(age.notna(), "Unknown").tolist()
+
+# --- DUPLICATE DETECTION ---
+# Each list key gets a companion set ("race_results" -> "race_results_fp") holding
+# a normalised fingerprint of every record, so duplicate checks are a single SADD.
+def result_fingerprint(rec):
+    event = rec.get('distance') or rec.get('race_name') or rec.get('race') or ""
+    race_date = rec.get('race_date') or rec.get('date') or ""
+    secs = time_to_seconds(rec['time_display']) if rec.get('time_display') else rec.get('time_seconds', "")
+    raw = "|".join([" ".join(str(rec.get('name', "")).split()).lower(), str(event).strip().lower(), str(race_date).strip(), str(secs)])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def fp_key(list_key):
+    return f"{list_key}_fp"
+
+def ensure_fingerprint_index(r, list_key):
+    # Lists that predate fingerprinting get their set built on first use, so duplicate
+    # checks cover records already stored rather than only those added since
+    if not r.exists(fp_key(list_key)) and r.llen(list_key):
+        rebuild_fingerprint_index(r, list_key)
+
+def push_unique(r, list_key, rec, also=None):
+    # Returns False (and pushes nothing) when an identical record is already stored.
+    # The fingerprint, the record and any writes `also` adds to the pipeline go in one MULTI,
+    # so a dropped connection leaves all of them or none and the push is safe to retry.
+    ensure_fingerprint_index(r, list_key)
+    key, fp = fp_key(list_key), result_fingerprint(rec)
+    with r.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(key)
+                if pipe.sismember(key, fp):
+                    return False
+                pipe.multi()
+                pipe.sadd(key, fp)
+                pipe.rpush(list_key, json.dumps(rec))
+                if also:
+                    also(pipe)
+                pipe.execute()
+                return True
+            except redis.exceptions.WatchError:
+                continue
+
+def enqueue_unique(r, queue_key, rec):
+    # Submissions are queued ("pending_results", "champ_pending") by the public submission
+    # app, which lives outside this repo; it should enqueue through this so a resubmitted
+    # form is dropped here instead of showing up twice for review
+    return push_unique(r, queue_key, rec)
+
+def forget_fingerprint(r, list_key, rec):
+    r.srem(fp_key(list_key), result_fingerprint(rec))
+
+def group_duplicates(raw_list):
+    # Groups raw JSON entries by fingerprint, preserving first-seen order
+    groups = {}
+    for raw in raw_list:
+        try:
+            rec = json.loads(raw)
+        except:
+            continue
+        groups.setdefault(result_fingerprint(rec), []).append(raw)
+    return groups
+
+def rebuild_fingerprint_index(r, list_key):
+    groups = group_duplicates(r.lrange(list_key, 0, -1))
+    pipe = r.pipeline()
+    pipe.delete(fp_key(list_key))
+    if groups:
+        pipe.sadd(fp_key(list_key), *groups.keys())
+    pipe.execute()
+    return {fp: raws for fp, raws in groups.items() if len(raws) > 1}
+
+def remove_duplicates(r, list_key, dupes):
+    # Keeps the first copy of each duplicate group; returns the number removed
+    removed = 0
+    for raws in dupes.values():
+        for raw in raws[1:]:
+            removed += r.lrem(list_key, 1, raw)
+    return removed
+
+# --- CHAMPIONSHIP SCORING ---
+# Points are winner_time / runner_time * 100 within each category and gender of a race.
+def champ_race_name(rec):
+    return rec.get('race_name') or rec.get('race') or ""
+
+def valid_time(t_display):
+    # Unreadable times parse to 999999 and "0:00" to 0; either would decide a group's winner
+    return 0 < time_to_seconds(format_time_string(t_display)) < 999999
+
+def score_entries(entries, member_db, mode="10Y"):
+    # Entries without a valid time are left out; callers list them for the admin to fix or reject
+    entries = [e for e in entries if valid_time(e.get('time_display'))]
+    if not entries:
+        return []
+    pd = load_pandas()
+    df = pd.DataFrame(entries)
+    members = [member_db.get(e['name'], {}) for e in entries]
+    df['gender'] = [m.get('gender') or e.get('gender', 'Unknown') for m, e in zip(members, entries)]
+    cats = get_categories([m.get('dob') for m in members], df['date'], mode)
+    df['category'] = [e.get('category', c) if c == "Unknown" else c for c, e in zip(cats, entries)]
+    secs = df['time_display'].map(lambda t: time_to_seconds(format_time_string(t)))
+    winner = secs.groupby([df['category'], df['gender']]).transform('min')
+    df['points'] = (winner / secs * 100).round(1)
+    return json.loads(df.to_json(orient='records'))
+
+# --- CHAMPIONSHIP SEASONS ---
+# Each season has its own calendar ("champ_calendar_2026") whose races carry a stable id,
+# and a hash of results keyed by race id ("champ_results_2026"), so scoring and standings
+# only read the season they need. "champ_seasons" lists the seasons held in Redis.
+def champ_results_key(season):
+    return f"champ_results_{season}"
+
+def valid_season(season):
+    return len(str(season)) == 4 and str(season).isdigit()
+
+def champ_seasons(r):
+    # Seasons filed from undated rows ("", "nan") by earlier imports are left out
+    return sorted({s for s in r.smembers("champ_seasons") if valid_season(s)} | {str(datetime.now().year)}, reverse=True)
+
+def get_calendar(r, season):
+    raw = r.get(f"champ_calendar_{season}")
+    races = json.loads(raw) if raw else []
+    # Calendars saved before races had ids get them assigned (and kept) on first read
+    if any(not race.get('id') for race in races):
+        races = save_calendar(r, season, races)
+    return races
+
+def save_calendar(r, season, races):
+    for race in races:
+        if not race.get('id'):
+            race['id'] = uuid.uuid4().hex[:8]
+    r.set(f"champ_calendar_{season}", json.dumps(races))
+    r.sadd("champ_seasons", str(season))
+    return races
+
+def filled_races(rows):
+    # Rows from a calendar editor, minus the blank and "TBC" placeholders nobody filled in
+    races = [{k: v for k, v in row.items() if isinstance(v, str) and v} for row in rows]
+    return [race for race in races if race.get('name') and race['name'] != "TBC"]
+
+def find_race(calendar, race_name, race_date=None):
+    wanted = " ".join(str(race_name).split()).lower()
+    for race in calendar:
+        if " ".join(str(race.get('name', "")).split()).lower() == wanted:
+            return race
+    return next((race for race in calendar if race_date and race.get('date') == str(race_date)), None)
+
+def season_of(rec):
+    return str(rec.get('date') or rec.get('race_date') or "")[:4]
+
+def get_race_results(r, season, race_id):
+    raw = r.hget(champ_results_key(season), race_id)
+    return json.loads(raw) if raw else []
+
+def get_season_results(r, season):
+    return [e for raw in r.hvals(champ_results_key(season)) for e in json.loads(raw)]
+
+def store_race_results(r, season, race_id, entries):
+    key = champ_results_key(season)
+    pipe = r.pipeline()
+    pipe.hset(key, race_id, json.dumps(entries))
+    pipe.sadd("champ_seasons", str(season))
+    pipe.execute()
+
+def add_race_results(r, season, race, new_entries):
+    # Appends pre-scored entries (imports, migrations), skipping ones already stored
+    existing = get_race_results(r, season, race['id'])
+    known = {result_fingerprint(e) for e in existing}
+    fresh = []
+    for e in new_entries:
+        fp = result_fingerprint(e)
+        if fp not in known:
+            known.add(fp)
+            fresh.append({**e, "season": str(season), "race_id": race['id'], "race_name": race['name']})
+    store_race_results(r, season, race['id'], existing + fresh)
+    return len(fresh)
+
+def latest_per_runner(entries):
+    # One entry per runner in a race; a later entry (a corrected resubmission) replaces the earlier one
+    by_name = {}
+    for e in entries:
+        by_name.pop(e['name'], None)
+        by_name[e['name']] = e
+    return list(by_name.values())
+
+def rescore_race(r, season, race, new_entries, member_db, mode="10Y"):
+    # Scores new entries together with everything already approved for the race,
+    # so a late faster result lowers the points of the rest of its group.
+    existing = get_race_results(r, season, race['id'])
+    known = {result_fingerprint(e) for e in existing}
+    fresh = [{**e, "season": str(season), "race_id": race['id'], "race_name": race['name']} for e in new_entries if result_fingerprint(e) not in known and valid_time(e.get('time_display'))]
+    entries = latest_per_runner(existing + fresh)
+    # Older log rows without a recorded (or readable) time keep the points they were given
+    kept = [e for e in entries if not valid_time(e.get('time_display'))]
+    scored = score_entries([e for e in entries if valid_time(e.get('time_display'))], member_db, mode)
+    store_race_results(r, season, race['id'], kept + scored)
+    return scored
+
+def export_season(r, season):
+    return {"season": str(season), "calendar": get_calendar(r, season),
+            "results": {k: json.loads(v) for k, v in r.hgetall(champ_results_key(season)).items()}}
+
+def archive_season(r, season):
+    # Callers should hand the export_season() payload to the admin before calling this
+    key = champ_results_key(season)
+    r.delete(f"champ_calendar_{season}", key)
+    r.srem("champ_seasons", str(season))
+
+def restore_season(r, payload):
+    season = payload['season']
+    save_calendar(r, season, payload.get('calendar', []))
+    for race_id, entries in payload.get('results', {}).items():
+        store_race_results(r, season, race_id, entries)
+    return season
+
+def import_champ_results(r, entries):
+    # Files loose results (name, race_name, date, ...) under their season and calendar race,
+    # adding a calendar entry for races that are not listed yet. Returns (added, rejected),
+    # rejected being the rows whose date gives no season; they are not stored.
+    calendars, added, rejected = {}, 0, []
+    for e in entries:
+        season = season_of(e)
+        if not valid_season(season):
+            rejected.append(e)
+            continue
+        cal = calendars.setdefault(season, get_calendar(r, season))
+        race = find_race(cal, champ_race_name(e), e.get('date'))
+        if race is None:
+            race = {"name": champ_race_name(e), "date": str(e.get('date', "")), "distance": "TBC", "terrain": "Road"}
+            cal.append(race)
+            save_calendar(r, season, cal)
+        added += add_race_results(r, season, race, [e])
+    return added, rejected
+
+def migrate_legacy_champ(r):
+    # One-off move of the old season-less "champ_results_final" list into season storage.
+    # Undated rows stay in the old list for the admin to fix.
+    legacy = r.lrange("champ_results_final", 0, -1)
+    moved, rejected = import_champ_results(r, [json.loads(x) for x in legacy])
+    pipe = r.pipeline()
+    pipe.delete("champ_results_final", fp_key("champ_results_final"))
+    for raw in legacy:
+        if json.loads(raw) in rejected:
+            pipe.rpush("champ_results_final", raw)
+    pipe.execute()
+    return moved, rejected
+
+# --- RANKINGS & MEMBER HISTORY ---
+# Sorted sets of each runner's best time (member = name, score = time_seconds) for
+# every distance/gender, plus per-season and per-category slices of the same bucket.
+# Each member also has their own results in date order ("member_results_<name>") and a
+# hash of precomputed bests ("member_summary_<name>"). "result_index_keys" tracks all of
+# these so they can be rebuilt from race_results.
+def rank_keys_for(rec, mode="10Y"):
+    base = f"rank_{rec.get('distance')}_{rec.get('gender')}"
+    keys = {"all_time": base}
+    year = str(rec.get('race_date', ""))[:4]
+    if year:
+        keys["season"] = f"{base}_{year}"
+    keys["category"] = f"{base}_{get_category(rec.get('dob'), rec.get('race_date'), mode)}"
+    return keys
+
+def history_key(name):
+    return f"member_results_{name}"
+
+def summary_key(name):
+    return f"member_summary_{name}"
+
+def date_score(race_date):
+    try:
+        return int(str(race_date)[:10].replace('-', ''))
+    except:
+        return 0
+
+def summarise_results(results):
+    # "pb_<distance>" and "sb_<year>_<distance>" -> the fastest result for each
+    best = {}
+    for rec in results:
+        for field in [f"pb_{rec.get('distance')}", f"sb_{str(rec.get('race_date', ''))[:4]}_{rec.get('distance')}"]:
+            if field not in best or rec['time_seconds'] < best[field]['time_seconds']:
+                best[field] = rec
+    return {k: json.dumps(v) for k, v in best.items()}
+
+def index_rank(rec, mode, pipe):
+    for key in rank_keys_for(rec, mode).values():
+        # LT keeps each runner's fastest time only
+        pipe.zadd(key, {rec['name']: rec['time_seconds']}, lt=True)
+        pipe.sadd("result_index_keys", key)
+
+def index_result(r, rec, mode="10Y", pipe=None):
+    p = pipe or r.pipeline()
+    index_rank(rec, mode, p)
+    p.zadd(history_key(rec['name']), {json.dumps(rec, sort_keys=True): date_score(rec.get('race_date'))})
+    p.sadd("result_index_keys", history_key(rec['name']), summary_key(rec['name']))
+    if pipe is None:
+        p.execute()
+
+def ensure_result_indexes(r, mode="10Y"):
+    # Results stored before the indexes existed are indexed on first use, so existing
+    # results rank against each other instead of each showing #1/1
+    if not r.exists("result_index_keys") and r.llen("race_results"):
+        rebuild_result_indexes(r, mode)
+
+def add_result(r, rec, mode="10Y"):
+    ensure_result_indexes(r, mode)
+    # Only the bests this result could beat are read back; the index and summary writes
+    # then go in the same MULTI as the push itself
+    fields = list(summarise_results([rec]))
+    current = r.hmget(summary_key(rec['name']), fields)
+    better = {f: v for f, v, old in zip(fields, summarise_results([rec]).values(), current)
+              if old is None or rec['time_seconds'] < json.loads(old)['time_seconds']}
+    def also(pipe):
+        index_result(r, rec, mode, pipe)
+        if better:
+            pipe.hset(summary_key(rec['name']), mapping=better)
+    return push_unique(r, "race_results", rec, also)
+
+def rebuild_result_indexes(r, mode="10Y"):
+    pipe = r.pipeline()
+    old = r.smembers("result_index_keys")
+    if old:
+        pipe.delete("result_index_keys", *old)
+    by_member = {}
+    for raw in r.lrange("race_results", 0, -1):
+        try:
+            rec = json.loads(raw)
+            index_result(r, rec, mode, pipe)
+            by_member.setdefault(rec['name'], []).append(rec)
+        except:
+            continue
+    for name, results in by_member.items():
+        pipe.hset(summary_key(name), mapping=summarise_results(results))
+    pipe.execute()
+
+def refresh_member(r, removed, mode="10Y", added=None):
+    # After a result is deleted (or replaced by an edited copy): drop it from the runner's
+    # history, take the runner out of that result's rank buckets, then re-add the times
+    # they still hold and re-summarise
+    ensure_result_indexes(r, mode)
+    name = removed['name']
+    r.zrem(history_key(name), json.dumps(removed, sort_keys=True))
+    if added:
+        index_result(r, added, mode)
+    remaining = get_member_history(r, name)
+    pipe = r.pipeline()
+    for key in rank_keys_for(removed, mode).values():
+        pipe.zrem(key, name)
+    for rec in remaining:
+        index_rank(rec, mode, pipe)
+    pipe.delete(summary_key(name))
+    if remaining:
+        pipe.hset(summary_key(name), mapping=summarise_results(remaining))
+    pipe.execute()
+
+def get_member_history(r, name):
+    return [json.loads(x) for x in r.zrange(history_key(name), 0, -1)]
+
+def get_member_summary(r, name):
+    return {k: json.loads(v) for k, v in r.hgetall(summary_key(name)).items()}
+
+def rank_many(r, recs, mode="10Y"):
+    # One round trip for any number of lookups; each answer maps bucket -> (place, runners, record),
+    # counting distinct runners and leaving the runner's own slower times out. record is True
+    # only when no time in the bucket, the runner's own included, beats this one.
+    ensure_result_indexes(r, mode)
+    pipe = r.pipeline()
+    plans = []
+    for rec in recs:
+        keys = rank_keys_for(rec, mode)
+        for key in keys.values():
+            pipe.zcount(key, "-inf", f"({rec['time_seconds']}")
+            pipe.zscore(key, rec['name'])
+            pipe.zcard(key)
+        plans.append(keys)
+    replies = iter(pipe.execute())
+    out = []
+    for rec, keys in zip(recs, plans):
+        ranks = {}
+        for label in keys:
+            faster, own, runners = next(replies), next(replies), next(replies)
+            record = faster == 0
+            if own is None:
+                runners += 1
+            elif own < rec['time_seconds']:
+                faster -= 1
+            ranks[label] = (faster + 1, runners, record)
+        out.append(ranks)
+    return out
+
+def rank_label(ranks, category=""):
+    titles = {"all_time": "all-time", "season": "season", "category": category or "category"}
+    parts = [f"#{pos}/{runners} {titles[label]}" for label, (pos, runners, _) in ranks.items()]
+    record = "🏆 Club record · " if ranks.get("all_time", (0, 0, False))[2] else ""
+    return record + " · ".join(parts)
+
+def rpush_once(r, key, value):
+    # RPUSH that does nothing when the exact value is already in the list, so a replayed
+    # write doesn't add it twice
+    with r.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(key)
+                if pipe.lpos(key, value) is not None:
+                    return False
+                pipe.multi()
+                pipe.rpush(key, value)
+                pipe.execute()
+                return True
+            except redis.exceptions.WatchError:
+                continue
+
+# Operations that queue_write may hold back while Redis is down (args must be JSON-serialisable).
+# Each must be safe to run more than once.
+QUEUED_WRITES = {
+    "add_result": add_result,
+    "rpush_once": rpush_once,
+}
@@ -1,23 +1,29 @@
+import time
+t_start = time.perf_counter()
 import streamlit as st
 import json
-from helpers import get_redis, format_time_string, time_to_seconds
+from helpers import get_redis, record_page_profile, snapshot_read, stale_banner, queue_write, get_club_settings, get_category, format_time_string, time_to_seconds, add_result, forget_fingerprint, group_duplicates, fp_key, ensure_fingerprint_index, rank_many, rank_label
+t_imported = time.perf_counter()
 
 # Page Config
 st.set_page_config(page_title="Submissions", layout="wide")
 
-r = get_redis()
-
 # --- PERSISTENT URL-BASED AUTHENTICATION ---
 if st.query_params.get("access") == "granted":
     st.session_state['authenticated'] = True
 
 if not st.session_state.get('authenticated'):
     st.warning("Please login on the Home page to access this section.")
+    record_page_profile("Submissions", t_start, t_imported, gated=True)
     st.stop()
 
+r = get_redis()
+offline = stale_banner(r)
+
 st.header("📥 Manual Entry & Approvals")
-raw_mem = r.lrange("members", 0, -1)
+raw_mem = snapshot_read("members", lambda: r.lrange("members", 0, -1))
 members_data = [json.loads(m) for m in raw_mem]
+age_mode = get_club_settings()['age_mode']
 
 with st.form("direct_add"):
     c1, c2, c3 = st.columns(3)
@@ -29,17 +35,44 @@ with st.form("direct_add"):
     if st.form_submit_button("Add Result"):
         m = next(x for x in members_data if x['name'] == n)
         entry = {"name": n, "gender": m['gender'], "dob": m['dob'], "distance": d, "time_seconds": time_to_seconds(t), "time_display": format_time_string(t), "location": loc, "race_date": str(rd)}
-        r.rpush("race_results", json.dumps(entry)); st.success("Added"); st.rerun()
+        added = queue_write(r, "add_result", entry, age_mode)
+        if added is None: st.info("Database unreachable: the result is queued and will be saved when it is back.")
+        elif added: st.success("Added"); st.rerun()
+        else: st.warning("This result is already in the log.")
 
 st.divider()
 st.subheader("Pending PB Approvals")
+if offline:
+    st.info("Approvals need the live database.")
+    record_page_profile("Submissions", t_start, t_imported)
+    st.stop()
 pending = r.lrange("pending_results", 0, -1)
-for i, p_json in enumerate(pending):
-    p = json.loads(p_json)
-    with st.expander(f"Review: {p['name']} - {p['distance']}"):
-        match = next((m for m in members_data if m['name'] == p['name']), None)
-        if match and st.button("✅ Approve", key=f"app_{i}"):
-            entry = {"name": p['name'], "gender": match['gender'], "dob": match['dob'], "distance": p['distance'], "time_seconds": time_to_seconds(p['time_display']), "time_display": format_time_string(p['time_display']), "location": p['location'], "race_date": p['race_date']}
-            r.rpush("race_results", json.dumps(entry)); r.lrem("pending_results", 1, p_json); st.rerun()
+# Identical submissions are collapsed into one review; approving or rejecting clears every copy
+groups = list(group_duplicates(pending).items())
+entries = []
+for fp, copies in groups:
+    p = json.loads(copies[0])
+    match = next((m for m in members_data if m['name'] == p['name']), None)
+    entries.append({"name": p['name'], "gender": match['gender'], "dob": match['dob'], "distance": p['distance'], "time_seconds": time_to_seconds(p['time_display']), "time_display": format_time_string(p['time_display']), "location": p['location'], "race_date": p['race_date']} if match else None)
+ensure_fingerprint_index(r, "race_results")
+# Where each submitted time would place, looked up for the whole queue in one go
+ranks = iter(rank_many(r, [e for e in entries if e], age_mode))
+
+for i, ((fp, copies), entry) in enumerate(zip(groups, entries)):
+    p = json.loads(copies[0])
+    dupe_note = f" (x{len(copies)})" if len(copies) > 1 else ""
+    with st.expander(f"Review: {p['name']} - {p['distance']}{dupe_note}"):
+        already_logged = r.sismember(fp_key("race_results"), fp)
+        if already_logged:
+            st.info("An identical result is already in the Race Log.")
+        if entry:
+            st.caption(rank_label(next(ranks), get_category(entry['dob'], entry['race_date'], age_mode)))
+        if entry and st.button("✅ Approve", key=f"app_{i}"):
+            add_result(r, entry, age_mode)
+            for c in copies: r.lrem("pending_results", 0, c)
+            forget_fingerprint(r, "pending_results", p); st.rerun()
         if st.button("❌ Reject", key=f"rej_{i}"):
-            r.lrem("pending_results", 1, p_json); st.rerun()
+            for c in copies: r.lrem("pending_results", 0, c)
+            forget_fingerprint(r, "pending_results", p); st.rerun()
+
+record_page_profile("Submissions", t_start, t_imported)
@@ -1,29 +1,43 @@
+import time
+t_start = time.perf_counter()
 import streamlit as st
 import json
-from helpers import get_redis, format_time_string, time_to_seconds
+from helpers import get_redis, record_page_profile, snapshot_read, stale_banner, get_club_settings, get_category, format_time_string, time_to_seconds, forget_fingerprint, result_fingerprint, unique_ids, refresh_member, rank_many, rank_label
+t_imported = time.perf_counter()
 
 # Page Config
 st.set_page_config(page_title="Race Log", layout="wide")
 
-r = get_redis()
-
 # --- PERSISTENT URL-BASED AUTHENTICATION ---
 if st.query_params.get("access") == "granted":
     st.session_state['authenticated'] = True
 
 if not st.session_state.get('authenticated'):
     st.warning("Please login on the Home page to access this section.")
+    record_page_profile("Race Log", t_start, t_imported, gated=True)
     st.stop()
 
+r = get_redis()
+offline = stale_banner(r)
+
 st.header("📋 Master Record Log")
-results = r.lrange("race_results", 0, -1)
-for idx, val in enumerate(results):
-    item = json.loads(val)
+age_mode = get_club_settings()['age_mode']
+raw_results = snapshot_read("race_results", lambda: r.lrange("race_results", 0, -1))
+results = [json.loads(val) for val in raw_results]
+# Ranks and deletes need the live database; the stale copy is shown read-only
+ranks = rank_many(r, results, age_mode) if not offline else [{} for _ in results]
+# Rows are keyed by record id, so a delete can't land on the row that moved into its slot
+row_ids = unique_ids(result_fingerprint(item) for item in results)
+for val, item, rid, item_ranks in zip(raw_results, results, row_ids, ranks):
     with st.container(border=True):
         c1, c2 = st.columns([4,1])
         c1.write(f"**{item['name']}** - {item['distance']} - {item['time_display']} ({item['race_date']})")
-        if c2.button("🗑️ Delete", key=f"del_{idx}"):
-            # Your specific WIPE and REMOVE logic preserved
-            r.lset("race_results", idx, "WIPE")
-            r.lrem("race_results", 1, "WIPE")
+        if item_ranks:
+            c1.caption(rank_label(item_ranks, get_category(item.get('dob'), item.get('race_date'), age_mode)))
+        if c2.button("🗑️ Delete", key=f"del_{rid}", disabled=offline):
+            r.lrem("race_results", 1, val)
+            forget_fingerprint(r, "race_results", item)
+            refresh_member(r, item, age_mode)
             st.rerun()
+
+record_page_profile("Race Log", t_start, t_imported)
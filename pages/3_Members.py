@@ -1,20 +1,25 @@
+import time
+t_start = time.perf_counter()
 import streamlit as st
 import json
-from helpers import get_redis
+from helpers import get_redis, record_page_profile, snapshot_read, stale_banner, queue_write, unique_ids, replace_in_list
+t_imported = time.perf_counter()
 
 # Page Config
 st.set_page_config(page_title="Member Management", layout="wide")
 
-r = get_redis()
-
 # --- PERSISTENT URL-BASED AUTHENTICATION ---
 if st.query_params.get("access") == "granted":
     st.session_state['authenticated'] = True
 
 if not st.session_state.get('authenticated'):
     st.warning("Please login on the Home page to access this section.")
+    record_page_profile("Members", t_start, t_imported, gated=True)
     st.stop()
 
+r = get_redis()
+offline = stale_banner(r)
+
 st.header("👤 Member Management")
 
 # --- SECTION 1: ADD NEW MEMBER (Concise Row) ---
@@ -33,26 +38,29 @@ with st.expander("➕ Add New Member", expanded=False):
                 "gender": new_gen, 
                 "status": "Active"
             }
-            r.rpush("members", json.dumps(m_data))
-            st.success(f"Added {new_name}")
-            st.rerun()
+            if queue_write(r, "rpush_once", "members", json.dumps(m_data)) is None:
+                st.info(f"Database unreachable: {new_name} is queued and will be added when it is back.")
+            else:
+                st.success(f"Added {new_name}")
+                st.rerun()
 
 st.divider()
 
 # --- SECTION 2: EDIT / SEARCH MEMBERS ---
-raw_mems = r.lrange("members", 0, -1)
-mems = [json.loads(m) for m in raw_mems]
-mems = sorted(mems, key=lambda x: x['name'])
+raw_mems = snapshot_read("members", lambda: r.lrange("members", 0, -1))
+# Keep each member's stored JSON alongside it: rows are sorted, so list positions can't be used for writes
+mems = sorted(((json.loads(m), m) for m in raw_mems), key=lambda x: x[0]['name'])
+mem_ids = unique_ids(m['name'] for m, _ in mems)
 
 search = st.text_input("🔍 Search Members", "").lower()
 
-for i, m in enumerate(mems):
+for (m, m_raw), mid in zip(mems, mem_ids):
     if search and search not in m['name'].lower():
         continue
         
     # Removed the status color emoji from the label
     with st.expander(f"{m['name']} ({m['gender']})"):
-        with st.form(f"edit_{i}"):
+        with st.form(f"edit_{mid}"):
             c1, c2, c3 = st.columns(3)
             
             # Editable fields
@@ -64,20 +72,24 @@ for i, m in enumerate(mems):
             edit_stat = c4.selectbox("Status", ["Active", "Left"], index=0 if m.get('status', 'Active')=="Active" else 1)
             
             # Save Logic
-            if c5.form_submit_button("💾 Save Changes"):
+            if c5.form_submit_button("💾 Save Changes", disabled=offline):
                 updated_m = {
                     "name": edit_name,
                     "dob": edit_dob,
                     "gender": edit_gen,
                     "status": edit_stat
                 }
-                # Replace in Redis
-                r.lset("members", i, json.dumps(updated_m))
-                st.success("Updated!")
-                st.rerun()
+                # Replace in Redis, unless someone else changed or removed the row since it was loaded
+                if replace_in_list(r, "members", None, m_raw, json.dumps(updated_m)):
+                    st.success("Updated!")
+                    st.rerun()
+                else:
+                    st.error("This member was changed or removed since the page loaded. Refresh and try again.")
             
             # Delete Logic
-            if c6.form_submit_button("🗑️ Delete Member"):
-                r.lrem("members", 1, json.dumps(m))
+            if c6.form_submit_button("🗑️ Delete Member", disabled=offline):
+                r.lrem("members", 1, m_raw)
                 st.warning(f"Deleted {m['name']}")
                 st.rerun()
+
+record_page_profile("Members", t_start, t_imported)
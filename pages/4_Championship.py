@@ -1,21 +1,33 @@
+import time
+t_start = time.perf_counter()
 import streamlit as st
 import json
-import pandas as pd
 from datetime import datetime
-from helpers import get_redis, get_club_settings, get_category, format_time_string
+from helpers import get_redis, record_page_profile, snapshot_read, stale_banner, load_pandas, get_club_settings, format_time_string, add_result, forget_fingerprint, group_duplicates, result_fingerprint, score_entries, valid_time, latest_per_runner, rescore_race, champ_seasons, get_calendar, save_calendar, filled_races, find_race, season_of, get_race_results, get_season_results, champ_results_key
+t_imported = time.perf_counter()
 
 st.set_page_config(page_title="Champ Management", layout="wide")
-r = get_redis()
-settings = get_club_settings()
 
 if not st.session_state.get('authenticated'):
     st.warning("Please login on the Home page.")
+    record_page_profile("Championship", t_start, t_imported, gated=True)
     st.stop()
 
+r = get_redis()
+offline = stale_banner(r)
+settings = get_club_settings()
+
 st.header("🏅 Championship Management")
 
-# Updated to include the Leaderboard tab
-tabs = st.tabs(["📥 Pending Approvals", "🗓️ Calendar Setup", "📊 Championship Log", "🏆 Leaderboard"])
+season = st.selectbox("Season", sorted(set(snapshot_read("champ_seasons", lambda: champ_seasons(r))) | {str(datetime.now().year + 1)}, reverse=True), key="champ_season")
+
+# Only the selected section runs (st.tabs would execute all four on every rerun)
+sections = ["📥 Pending Approvals", "🗓️ Calendar Setup", "📊 Championship Log", "🏆 Leaderboard"]
+section = st.radio("Section", sections, horizontal=True, label_visibility="collapsed", key="champ_section")
+if offline and section in sections[:2]:
+    st.info("Approvals and calendar changes need the live database. The log and standings show the last saved copy.")
+    record_page_profile("Championship", t_start, t_imported)
+    st.stop()
 
 # --- HELPERS ---
 def get_seconds(t_str):
@@ -26,121 +38,155 @@ def get_seconds(t_str):
     except: return 0
     return 0
 
-# Load Members for lookup logic
-raw_mems = r.lrange("members", 0, -1)
-member_db = {json.loads(m)['name']: json.loads(m) for m in raw_mems}
+def pb_entry_for(p, dist):
+    m_info = member_db.get(p['name'], {})
+    return {
+        "name": p['name'],
+        "distance": dist,
+        "location": p['race_name'],
+        "race_date": p['date'],
+        "time_display": p['time_display'],
+        "time_seconds": get_seconds(p['time_display']),
+        "gender": m_info.get('gender', 'Unknown'),
+        "dob": m_info.get('dob', '2000-01-01')
+    }
+
+def approve_race(p_season, race, group, dist):
+    # group is a list of (raw copies, parsed entry, fingerprint) from the pending queue;
+    # entries without a valid time stay pending
+    group = [g for g in group if valid_time(g[1]['time_display'])]
+    rescore_race(r, p_season, race, [p for _, p, _ in group], member_db, settings['age_mode'])
+    for copies, p, _ in group:
+        add_result(r, pb_entry_for(p, dist), settings['age_mode'])
+        for c in copies: r.lrem("champ_pending", 0, c)
+        forget_fingerprint(r, "champ_pending", p)
 
 # --- TAB 1: PENDING APPROVALS ---
-with tabs[0]:
+if section == sections[0]:
     st.subheader("Results Awaiting Review")
+    # Load Members for lookup logic
+    raw_mems = r.lrange("members", 0, -1)
+    member_db = {json.loads(m)['name']: json.loads(m) for m in raw_mems}
     pending = r.lrange("champ_pending", 0, -1)
     
     if not pending:
         st.info("No pending championship results.")
     else:
-        for i, p_raw in enumerate(pending):
-            p = json.loads(p_raw)
-            with st.expander(f"Review: {p['name']} - {p['race_name']}"):
-                col1, col2, col3 = st.columns(3)
-                col1.write(f"**Time:** {p['time_display']}")
-                col2.write(f"**Date:** {p['date']}")
-                
-                pts = st.number_input(f"Points for {p['name']}", 0.0, 100.0, 0.0, key=f"pts_{i}")
-                dist = st.selectbox("Confirm Distance", ["5k", "10k", "10 Mile", "HM", "Marathon"], key=f"dist_{i}")
-                
-                c_app, c_rej = st.columns(2)
-                
-                if c_app.button("✅ Approve & Add to PB Log", key=f"app_{i}"):
-                    m_info = member_db.get(p['name'], {})
-                    cat = get_category(m_info.get('dob','2000-01-01'), p['date'], settings['age_mode'])
-                    
-                    champ_entry = {
-                        **p, 
-                        "points": pts, 
-                        "category": cat,
-                        "gender": m_info.get('gender', 'Unknown')
-                    }
-                    r.rpush("champ_results_final", json.dumps(champ_entry))
+        track_distances = ["5k", "10k", "10 Mile", "HM", "Marathon"]
+        calendars = {}
+
+        # Identical submissions are collapsed into one review; approving or rejecting clears every copy.
+        # Submissions are grouped by the calendar race they belong to (matched by season and name).
+        by_race = {}
+        for fp, copies in group_duplicates(pending).items():
+            p = json.loads(copies[0])
+            p_season = season_of(p)
+            cal = calendars.setdefault(p_season, get_calendar(r, p_season))
+            race = find_race(cal, p['race_name'], p['date'])
+            by_race.setdefault((p_season, race['id'] if race else p['race_name']), (race, []))[1].append((copies, p, fp))
+
+        for ri, ((p_season, _), (race, group)) in enumerate(by_race.items()):
+            st.markdown(f"#### {p_season}: {group[0][1]['race_name']} ({len(group)} pending)")
+            if race is None:
+                cal = calendars[p_season]
+                if not cal:
+                    st.warning(f"No {p_season} calendar yet. Add this race in Calendar Setup to score it.")
+                    continue
+                race = st.selectbox("Not on the calendar. Score as:", cal, format_func=lambda x: f"{x['name']} ({x['date']})", key=f"rsel_{ri}")
+
+            race_res = get_race_results(r, p_season, race['id'])
+            race_approved = [a for a in race_res if a.get('time_display')]
+            scored_fps = {result_fingerprint(a) for a in race_res}
+            approved_times = {a['name']: a['time_display'] for a in race_approved}
+            # Provisional points: pending entries scored together with those already approved
+            preview = {(e['name'], e['time_display']): e['points'] for e in score_entries(latest_per_runner(race_approved + [p for _, p, _ in group if valid_time(p['time_display'])]), member_db, settings['age_mode'])}
+
+            bad_times = [p for _, p, _ in group if not valid_time(p['time_display'])]
+            if bad_times:
+                st.error("Not scored, time missing, zero or unreadable: " + ", ".join(f"{p['name']} ({p['time_display']})" for p in bad_times) + ". Reject and ask for a corrected submission.")
+
+            default_dist = race.get('distance')
+            bc1, bc2 = st.columns([2, 3])
+            race_dist = bc1.selectbox("Confirm Distance", track_distances, index=track_distances.index(default_dist) if default_dist in track_distances else 0, key=f"rdist_{ri}")
+            if bc2.button(f"⚡ Score & Approve All ({len(group) - len(bad_times)})", key=f"batch_{ri}", disabled=len(bad_times) == len(group)):
+                approve_race(p_season, race, group, race_dist)
+                st.success(f"Scored {race['name']} and added all results to PBs.")
+                st.rerun()
+
+            for gi, (copies, p, fp) in enumerate(group):
+                i = f"{ri}_{gi}"
+                dupe_note = f" (x{len(copies)})" if len(copies) > 1 else ""
+                with st.expander(f"Review: {p['name']} - {p['race_name']}{dupe_note}"):
+                    col1, col2, col3 = st.columns(3)
+                    col1.write(f"**Time:** {p['time_display']}")
+                    col2.write(f"**Date:** {p['date']}")
+                    col3.write(f"**Points (provisional):** {preview.get((p['name'], p['time_display']), '-') if valid_time(p['time_display']) else 'invalid time'}")
+                    if fp in scored_fps:
+                        st.info("An identical result has already been scored.")
+                    elif p['name'] in approved_times:
+                        st.info(f"Approving replaces {p['name']}'s scored time of {approved_times[p['name']]} for this race.")
                     
-                    pb_entry = {
-                        "name": p['name'],
-                        "distance": dist,
-                        "location": p['race_name'],
-                        "race_date": p['date'],
-                        "time_display": p['time_display'],
-                        "time_seconds": get_seconds(p['time_display']),
-                        "gender": m_info.get('gender', 'Unknown'),
-                        "dob": m_info.get('dob', '2000-01-01')
-                    }
-                    r.rpush("race_results", json.dumps(pb_entry))
+                    c_app, c_rej = st.columns(2)
                     
-                    r.lset("champ_pending", i, "WIPE")
-                    r.lrem("champ_pending", 1, "WIPE")
-                    st.success(f"Approved! Added to Championship and PBs.")
-                    st.rerun()
+                    if c_app.button("✅ Approve & Add to PB Log", key=f"app_{i}", disabled=not valid_time(p['time_display'])):
+                        approve_race(p_season, race, [(copies, p, fp)], race_dist)
+                        st.success(f"Approved! Added to Championship and PBs.")
+                        st.rerun()
 
-                if c_rej.button("❌ Reject", key=f"rej_{i}"):
-                    r.lset("champ_pending", i, "WIPE")
-                    r.lrem("champ_pending", 1, "WIPE")
-                    st.rerun()
+                    if c_rej.button("❌ Reject", key=f"rej_{i}"):
+                        for c in copies: r.lrem("champ_pending", 0, c)
+                        forget_fingerprint(r, "champ_pending", p)
+                        st.rerun()
 
 # --- TAB 2: CALENDAR SETUP ---
-with tabs[1]:
-    st.subheader("15-Race Calendar Setup")
-    cal_raw = r.get("champ_calendar_2026")
-    current_cal = json.loads(cal_raw) if cal_raw else [{"name": "TBC", "date": "2026-01-01", "distance": "5k", "terrain": "Road"} for _ in range(15)]
+elif section == sections[1]:
+    pd = load_pandas()
+    st.subheader(f"{season} Calendar Setup")
+    current_cal = get_calendar(r, season) or [{"name": "TBC", "date": f"{season}-01-01", "distance": "5k", "terrain": "Road"} for _ in range(15)]
     
+    # One editable table instead of four widgets per race; race ids stay hidden and are kept on save
     with st.form("cal_form"):
-        updated_cal = []
-        track_distances = ["5k", "10k", "10 Mile", "HM", "Marathon", "TBC"]
+        cal_df = pd.DataFrame(current_cal, columns=["id", "name", "date", "distance", "terrain"])
+        edited = st.data_editor(
+            cal_df,
+            column_order=["name", "date", "distance", "terrain"],
+            column_config={
+                "name": st.column_config.TextColumn("Race"),
+                "date": st.column_config.TextColumn("Date (YYYY-MM-DD)"),
+                "distance": st.column_config.SelectboxColumn("Dist", options=["5k", "10k", "10 Mile", "HM", "Marathon", "TBC"]),
+                "terrain": st.column_config.SelectboxColumn("Terrain", options=["Road", "Trail", "Fell", "XC"]),
+            },
+            num_rows="dynamic", hide_index=True, use_container_width=True
+        )
         
-        for i in range(15):
-            c1, c2, c3, c4 = st.columns([3, 2, 2, 2])
-            n = c1.text_input(f"Race {i+1}", current_cal[i]['name'], key=f"n_{i}")
-            
-            try:
-                curr_date = datetime.strptime(current_cal[i]['date'], '%Y-%m-%d')
-            except:
-                curr_date = datetime(2026, 1, 1)
-            d = c2.date_input("Date", value=curr_date, key=f"d_{i}")
-            
-            curr_dist = current_cal[i].get('distance', '5k')
-            dist_idx = track_distances.index(curr_dist) if curr_dist in track_distances else 0
-            dist = c3.selectbox("Dist", track_distances, index=dist_idx, key=f"dist_cal_{i}")
-            
-            curr_terr = current_cal[i].get('terrain', 'Road')
-            terr_opts = ["Road", "Trail", "Fell", "XC"]
-            terr_idx = terr_opts.index(curr_terr) if curr_terr in terr_opts else 0
-            terr = c4.selectbox("Terrain", terr_opts, index=terr_idx, key=f"terr_{i}")
-            
-            updated_cal.append({"name": n, "date": str(d), "distance": dist, "terrain": terr})
-        
-        if st.form_submit_button("Save 2026 Calendar"):
-            r.set("champ_calendar_2026", json.dumps(updated_cal))
+        if st.form_submit_button(f"Save {season} Calendar"):
+            save_calendar(r, season, filled_races(edited.to_dict('records')))
             st.success("Calendar Saved!")
             st.rerun()
 
 # --- TAB 3: CHAMPIONSHIP LOG ---
-with tabs[2]:
-    st.subheader("Approved Results")
-    final_res = r.lrange("champ_results_final", 0, -1)
-    if final_res:
-        log_df = pd.DataFrame([json.loads(x) for x in final_res])
+elif section == sections[2]:
+    pd = load_pandas()
+    st.subheader(f"Approved Results ({season})")
+    season_res = snapshot_read(f"champ_results_{season}", lambda: get_season_results(r, season))
+    if season_res:
+        log_df = pd.DataFrame(season_res)
         st.dataframe(log_df, use_container_width=True)
         
-        if st.button("🗑️ Clear All Champ Results"):
+        if st.button(f"🗑️ Clear {season} Champ Results", disabled=offline):
             if st.checkbox("Confirm full deletion?"):
-                r.delete("champ_results_final")
+                r.delete(champ_results_key(season))
                 st.rerun()
     else:
         st.info("No approved results yet.")
 
 # --- TAB 4: LEADERBOARD (Admin View) ---
-with tabs[3]:
-    st.subheader("Current Standings (Best 6)")
-    final_raw = r.lrange("champ_results_final", 0, -1)
-    if final_raw:
-        c_df = pd.DataFrame([json.loads(x) for x in final_raw])
+elif section == sections[3]:
+    pd = load_pandas()
+    st.subheader(f"{season} Standings (Best 6)")
+    season_res = snapshot_read(f"champ_results_{season}", lambda: get_season_results(r, season))
+    if season_res:
+        c_df = pd.DataFrame(season_res)
         c_df = c_df.sort_values(['name', 'points'], ascending=[True, False])
         
         # Best 6 Logic
@@ -151,3 +197,5 @@ with tabs[3]:
         st.table(league.sort_values('Total Points', ascending=False).reset_index(drop=True))
     else:
         st.info("No scores recorded yet.")
+
+record_page_profile("Championship", t_start, t_imported)
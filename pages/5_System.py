@@ -1,22 +1,33 @@
+import time
+t_start = time.perf_counter()
 import streamlit as st
 import json
-import pandas as pd
-from helpers import get_redis, get_club_settings
+from helpers import get_redis, record_page_profile, stale_banner, snapshot_age, pending_writes, failed_writes, SNAPSHOT_PATH, load_pandas, page_profiles, session_state_report, get_club_settings, add_result, rebuild_result_indexes, rebuild_fingerprint_index, remove_duplicates, group_duplicates, champ_seasons, get_season_results, import_champ_results, export_season, archive_season, restore_season, migrate_legacy_champ, champ_race_name, champ_results_key, store_race_results
+t_imported = time.perf_counter()
 
 st.set_page_config(page_title="System Settings", layout="wide")
-r = get_redis()
-settings = get_club_settings()
 
 if not st.session_state.get('authenticated'):
     st.warning("Please login on the Home page.")
+    record_page_profile("System", t_start, t_imported, gated=True)
     st.stop()
 
+r = get_redis()
+offline = stale_banner(r)
+settings = get_club_settings()
+
 st.header("⚙️ System Management")
 
-tabs = st.tabs(["🔧 General Settings", "📥 Bulk Upload", "💾 Backup & Export"])
+# Only the selected section runs, so exports and scans are not built on every visit
+sections = ["🔧 General Settings", "📥 Bulk Upload", "💾 Backup & Export", "🧹 Duplicates", "🗄️ Seasons", "📈 Instrumentation"]
+section = st.radio("Section", sections, horizontal=True, label_visibility="collapsed", key="sys_section")
+if offline and section != sections[-1]:
+    st.info("System tools need the live database.")
+    record_page_profile("System", t_start, t_imported)
+    st.stop()
 
 # --- TAB 1: GENERAL SETTINGS ---
-with tabs[0]:
+if section == sections[0]:
     st.subheader("Club Configuration")
     with st.form("settings_form"):
         col1, col2 = st.columns(2)
@@ -35,14 +46,20 @@ with tabs[0]:
             updated = {
                 "age_mode": new_age_mode,
                 "logo_url": new_logo,
-                "admin_password": new_pass if new_pass else settings['admin_password']
+                "admin_password": new_pass if new_pass else (r.get("admin_password") or "admin123")
             }
             r.set("club_settings", json.dumps(updated))
             st.success("Settings updated successfully!")
             st.rerun()
 
+    st.caption("Rankings and member histories are built automatically from the Race Log the first time they are needed and kept up to date on every write. Rebuild them after changing the age mode or editing data outside the admin.")
+    if st.button("🔁 Rebuild Rankings & Member Histories"):
+        rebuild_result_indexes(r, settings['age_mode'])
+        st.success("Indexes rebuilt.")
+
 # --- TAB 2: BULK UPLOAD ---
-with tabs[1]:
+elif section == sections[1]:
+    pd = load_pandas()
     st.subheader("Bulk Data Import")
     st.caption("Upload CSV files to populate your database. Ensure headers match exactly.")
     
@@ -63,10 +80,8 @@ with tabs[1]:
         if r_file:
             r_df = pd.read_csv(r_file)
             if st.button("Process Races"):
-                for _, row in r_df.iterrows():
-                    r_data = row.to_dict()
-                    r.rpush("race_results", json.dumps(r_data))
-                st.success(f"Imported {len(r_df)} race records!")
+                added = sum(add_result(r, row.to_dict(), settings['age_mode']) for _, row in r_df.iterrows())
+                st.success(f"Imported {added} race records! ({len(r_df) - added} duplicates skipped)")
 
     # Championship Upload
     with st.expander("🏅 Bulk Upload Championship Results"):
@@ -74,13 +89,15 @@ with tabs[1]:
         if c_file:
             c_df = pd.read_csv(c_file)
             if st.button("Process Champ Results"):
-                for _, row in c_df.iterrows():
-                    c_data = row.to_dict()
-                    r.rpush("champ_results_final", json.dumps(c_data))
-                st.success(f"Imported {len(c_df)} championship scores!")
+                added, rejected = import_champ_results(r, [row.to_dict() for _, row in c_df.iterrows()])
+                st.success(f"Imported {added} championship scores! ({len(c_df) - added - len(rejected)} duplicates skipped)")
+                if rejected:
+                    st.error(f"{len(rejected)} row(s) have no valid date, so no season to file them under. Fix and upload them again:")
+                    st.dataframe(pd.DataFrame(rejected), hide_index=True, use_container_width=True)
 
 # --- TAB 3: BACKUP & EXPORT ---
-with tabs[2]:
+elif section == sections[2]:
+    pd = load_pandas()
     st.subheader("Export Data (CSV)")
     st.info("Download your data regularly to keep a local backup.")
     
@@ -98,13 +115,116 @@ with tabs[2]:
         df_r = pd.DataFrame([json.loads(x) for x in raw_r])
         col2.download_button("📥 Download All Races", df_r.to_csv(index=False), "bbpb_races.csv", "text/csv")
 
-    # Export Championship
-    raw_c = r.lrange("champ_results_final", 0, -1)
-    if raw_c:
-        df_c = pd.DataFrame([json.loads(x) for x in raw_c])
-        col3.download_button("📥 Download Champ Log", df_c.to_csv(index=False), "bbpb_championship.csv", "text/csv")
+    # Export Championship (one season at a time)
+    exp_season = col3.selectbox("Champ Season", champ_seasons(r), key="exp_season")
+    season_c = get_season_results(r, exp_season)
+    if season_c:
+        df_c = pd.DataFrame(season_c)
+        col3.download_button("📥 Download Champ Log", df_c.to_csv(index=False), f"bbpb_championship_{exp_season}.csv", "text/csv")
 
     st.divider()
     if st.button("🔴 Clear All Cache", help="This does not delete data, just clears Streamlit's UI cache"):
         st.cache_data.clear()
         st.success("Cache cleared!")
+
+# --- TAB 4: DUPLICATE SCAN ---
+elif section == sections[3]:
+    pd = load_pandas()
+    st.subheader("Duplicate Results")
+    st.caption("Rebuilds the duplicate index and lists records with the same member, event, date and time.")
+    if st.button("🔍 Scan for Duplicates"):
+        st.session_state['dupe_scan'] = {k: rebuild_fingerprint_index(r, k) for k in ["race_results", "pending_results", "champ_pending"]}
+        # Championship results live in one list per calendar race
+        champ_dupes = {}
+        for s_key in champ_seasons(r):
+            for race_id, raw in r.hgetall(champ_results_key(s_key)).items():
+                groups = group_duplicates([json.dumps(e) for e in json.loads(raw)])
+                champ_dupes.update({(s_key, race_id, fp): raws for fp, raws in groups.items() if len(raws) > 1})
+        st.session_state['champ_dupe_scan'] = champ_dupes
+
+    scan = st.session_state.get('dupe_scan')
+    if scan is not None:
+        for list_key, dupes in scan.items():
+            st.markdown(f"**{list_key}**: {len(dupes)} duplicate group(s)")
+            if dupes:
+                rows = [{**json.loads(raws[0]), "copies": len(raws)} for raws in dupes.values()]
+                st.dataframe(pd.DataFrame(rows), use_container_width=True)
+        champ_scan = st.session_state.get('champ_dupe_scan', {})
+        st.markdown(f"**championship results**: {len(champ_scan)} duplicate group(s)")
+        if champ_scan:
+            st.dataframe(pd.DataFrame([{**json.loads(raws[0]), "copies": len(raws)} for raws in champ_scan.values()]), use_container_width=True)
+        if (any(scan.values()) or champ_scan) and st.button("🧹 Remove Extra Copies"):
+            removed = sum(remove_duplicates(r, k, d) for k, d in scan.items())
+            for s_key, race_id in {(s_key, race_id) for s_key, race_id, _ in champ_scan}:
+                race_res = json.loads(r.hget(champ_results_key(s_key), race_id) or "[]")
+                unique = [json.loads(raws[0]) for raws in group_duplicates([json.dumps(e) for e in race_res]).values()]
+                removed += len(race_res) - len(unique)
+                store_race_results(r, s_key, race_id, unique)
+            del st.session_state['dupe_scan']
+            st.session_state.pop('champ_dupe_scan', None)
+            st.success(f"Removed {removed} duplicate records.")
+
+# --- TAB 5: SEASONS ---
+elif section == sections[4]:
+    st.subheader("Championship Seasons")
+    if r.exists("champ_results_final"):
+        st.warning("Championship results from before seasons were introduced are still in the old log.")
+        if st.button("➡️ Move Old Results Into Seasons"):
+            moved, rejected = migrate_legacy_champ(r)
+            st.success(f"Moved {moved} results into their seasons.")
+            if rejected:
+                st.error(f"{len(rejected)} result(s) have no valid date and were left in the old log: " + ", ".join(f"{e.get('name')} ({champ_race_name(e)})" for e in rejected))
+            else:
+                st.rerun()
+
+    st.caption("Archive a finished season to a JSON file and remove it from the database. Archives can be restored at any time.")
+    arch_season = st.selectbox("Season", champ_seasons(r), key="arch_season")
+    payload = export_season(r, arch_season)
+    st.download_button("📥 Download Season Archive", json.dumps(payload), f"bbpb_championship_{arch_season}.json", "application/json")
+    if st.checkbox(f"I have downloaded the {arch_season} archive") and st.button(f"🗄️ Remove {arch_season} From Database"):
+        archive_season(r, arch_season)
+        st.success(f"{arch_season} archived.")
+        st.rerun()
+
+    st.divider()
+    a_file = st.file_uploader("Restore Season Archive (JSON)", type="json", key="a_up")
+    if a_file and st.button("Restore Season"):
+        restored = restore_season(r, json.load(a_file))
+        st.success(f"Restored {restored}.")
+        st.rerun()
+
+# --- TAB 6: INSTRUMENTATION ---
+elif section == sections[5]:
+    pd = load_pandas()
+    st.subheader("Startup Profile")
+    st.caption("Import and render times for each page since this server process started. \"First\" is the cold start; \"last\" is the most recent visit.")
+    s1, s2, s3 = st.columns(3)
+    if offline:
+        s1.metric("Redis round trip", "offline")
+    else:
+        t0 = time.perf_counter()
+        r.ping()
+        s1.metric("Redis round trip", f"{(time.perf_counter() - t0) * 1000:.1f} ms")
+    s2.metric("Offline snapshot", (snapshot_age() or "none yet") if SNAPSHOT_PATH else "disabled")
+    s3.metric("Queued writes", pending_writes())
+    if page_profiles:
+        st.dataframe(pd.DataFrame(list(page_profiles.values())), hide_index=True, use_container_width=True)
+    else:
+        st.info("No pages have been profiled yet.")
+
+    failed = failed_writes()
+    if failed:
+        st.subheader("Failed Queued Writes")
+        st.caption("Changes made while the database was down that failed on every replay. They are kept here, not retried; re-enter them by hand.")
+        st.dataframe(pd.DataFrame(failed), hide_index=True, use_container_width=True)
+
+    st.subheader("This Session")
+    sess = session_state_report()
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Session keys", sess['keys'])
+    m2.metric("Session size", f"{sess['bytes'] / 1024:.1f} KB")
+    m3.metric("Open edit forms", sess['edit_flags'])
+    if sess['largest']:
+        st.dataframe(pd.DataFrame(sess['largest'], columns=["Key", "Bytes"]), hide_index=True, use_container_width=True)
+
+record_page_profile("System", t_start, t_imported)
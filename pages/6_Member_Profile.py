@@ -0,0 +1,81 @@
+import time
+t_start = time.perf_counter()
+import streamlit as st
+import json
+from helpers import get_redis, record_page_profile, snapshot_read, stale_banner, load_pandas, get_club_settings, ensure_result_indexes, get_member_history, get_member_summary
+t_imported = time.perf_counter()
+
+# Page Config
+st.set_page_config(page_title="Member Profile", layout="wide")
+
+# --- PERSISTENT URL-BASED AUTHENTICATION ---
+if st.query_params.get("access") == "granted":
+    st.session_state['authenticated'] = True
+
+if not st.session_state.get('authenticated'):
+    st.warning("Please login on the Home page to access this section.")
+    record_page_profile("Member Profile", t_start, t_imported, gated=True)
+    st.stop()
+
+r = get_redis()
+offline = stale_banner(r)
+if not offline:
+    # Members whose results predate the history index get it built here, not only by the System rebuild
+    ensure_result_indexes(r, get_club_settings()['age_mode'])
+
+st.header("🏃 Member Profile")
+names = sorted(json.loads(m)['name'] for m in snapshot_read("members", lambda: r.lrange("members", 0, -1)))
+name = st.selectbox("Member", names)
+
+# Two small reads: the precomputed bests and the member's own dated results
+summary, history = snapshot_read(f"member_profile_{name}", lambda: [get_member_summary(r, name), get_member_history(r, name)]) if name else ({}, [])
+
+if not history:
+    st.info("No results recorded for this member yet.")
+    record_page_profile("Member Profile", t_start, t_imported)
+    st.stop()
+
+pd = load_pandas()
+
+all_dist = ["5k", "10k", "10 Mile", "HM", "Marathon"]
+
+# --- SECTION 1: CURRENT PBs ---
+st.subheader("Personal Bests")
+cols = st.columns(len(all_dist))
+for col, d in zip(cols, all_dist):
+    pb = summary.get(f"pb_{d}")
+    col.metric(d, pb['time_display'] if pb else "-", help=f"{pb['location']} ({pb['race_date']})" if pb else None)
+
+# --- SECTION 2: SEASON BESTS ---
+st.subheader("Season Bests")
+sb_rows = []
+for field, rec in summary.items():
+    if field.startswith("sb_"):
+        year = field.split("_")[1]
+        sb_rows.append({"Season": year, "Distance": rec['distance'], "Time": rec['time_display'], "Race": rec.get('location', ""), "Date": rec['race_date']})
+if sb_rows:
+    sb_df = pd.DataFrame(sb_rows)
+    sb_df['dist_order'] = sb_df['Distance'].map(lambda d: all_dist.index(d) if d in all_dist else len(all_dist))
+    st.dataframe(sb_df.sort_values(['Season', 'dist_order'], ascending=[False, True]).drop(columns='dist_order'), hide_index=True, use_container_width=True)
+
+# --- SECTION 3: PB PROGRESSION ---
+st.subheader("PB Progression")
+for d in all_dist:
+    runs = [h for h in history if h.get('distance') == d]
+    if not runs:
+        continue
+    with st.expander(f"{d} ({len(runs)} results)", expanded=len(runs) > 1):
+        # History is already in date order, so the running best is the progression
+        improvements, best = [], None
+        for h in runs:
+            if best is None or h['time_seconds'] < best['time_seconds']:
+                gain = f"-{best['time_seconds'] - h['time_seconds']}s" if best else "First"
+                improvements.append({"Date": h['race_date'], "Time": h['time_display'], "Race": h.get('location', ""), "Improvement": gain})
+                best = h
+        prog_df = pd.DataFrame(runs)
+        prog_df['Minutes'] = prog_df['time_seconds'] / 60
+        prog_df['Best'] = prog_df['Minutes'].cummin()
+        st.line_chart(prog_df.set_index(pd.to_datetime(prog_df['race_date']))[['Minutes', 'Best']])
+        st.dataframe(pd.DataFrame(improvements), hide_index=True, use_container_width=True)
+
+record_page_profile("Member Profile", t_start, t_imported)